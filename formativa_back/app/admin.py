@@ -1,9 +1,93 @@
 from django.contrib import admin
-from .models import Usuario, Disciplina, Sala, Reserva
-# Register your models here.
+from django.contrib.auth.admin import UserAdmin
+from .models import Usuario, Disciplina, Sala, Reserva, ReservaRecorrente, ExclusaoEmLote, Tarefa
 
-admin.site.register(Usuario)
-admin.site.register(Disciplina)
-admin.site.register(Sala)
-admin.site.register(Reserva)
+# As tabelas de usuários e reservas podem ter milhões de linhas: as buscas usam
+# prefixo (^) ou igualdade (=) para aproveitar os índices, os filtros ficam em
+# colunas indexadas e a contagem total da tabela não é recalculada a cada busca.
 
+
+@admin.register(Usuario)
+class UsuarioAdmin(UserAdmin):
+    list_display = ('username', 'first_name', 'last_name', 'ni', 'email', 'tipo', 'is_active')
+    list_filter = ('tipo',)
+    search_fields = ('^username', '^email')
+    ordering = ('username',)
+    show_full_result_count = False
+    fieldsets = UserAdmin.fieldsets + (
+        ('Escola', {'fields': ('tipo', 'ni', 'telefone', 'data_nascimento', 'data_contratacao')}),
+    )
+    add_fieldsets = UserAdmin.add_fieldsets + (
+        ('Escola', {'fields': ('tipo', 'ni', 'email')}),
+    )
+
+    def get_search_results(self, request, queryset, search_term):
+        # '=ni' em search_fields vira `ni LIKE 'termo'` (iexact), que converte a
+        # coluna inteira em texto e varre a tabela para qualquer termo, numérico
+        # ou não. A busca pelo NI é feita à parte, por igualdade, só com dígitos.
+        resultado, pode_duplicar = super().get_search_results(request, queryset, search_term)
+        termo = search_term.strip()
+        if termo.isdigit():
+            resultado |= queryset.filter(ni=int(termo))
+        return resultado, pode_duplicar
+
+
+@admin.register(Disciplina)
+class DisciplinaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'curso', 'carga_horaria', 'professor')
+    list_select_related = ('professor',)
+    search_fields = ('^nome',)
+    autocomplete_fields = ('professor',)
+    ordering = ('nome',)
+    show_full_result_count = False
+
+
+@admin.register(Sala)
+class SalaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'curso', 'capacidade', 'periodo', 'professor')
+    list_select_related = ('professor',)
+    list_filter = ('periodo',)
+    search_fields = ('^nome',)
+    autocomplete_fields = ('professor',)
+    ordering = ('nome',)
+    show_full_result_count = False
+
+
+@admin.register(Reserva)
+class ReservaAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'professor', 'disciplina', 'periodo', 'data_inicio', 'data_termino')
+    list_select_related = ('sala_reservada', 'professor', 'disciplina')
+    list_filter = ('periodo',)
+    search_fields = ('^sala_reservada__nome',)
+    autocomplete_fields = ('sala_reservada', 'professor', 'disciplina')
+    date_hierarchy = 'data_inicio'
+    ordering = ('-data_inicio',)
+    show_full_result_count = False
+
+
+@admin.register(ReservaRecorrente)
+class ReservaRecorrenteAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'professor', 'disciplina', 'periodo', 'data_inicio', 'data_fim')
+    list_select_related = ('sala_reservada', 'professor', 'disciplina')
+    search_fields = ('^sala_reservada__nome',)
+    autocomplete_fields = ('sala_reservada', 'professor', 'disciplina')
+    ordering = ('-data_inicio',)
+    show_full_result_count = False
+
+
+@admin.register(ExclusaoEmLote)
+class ExclusaoEmLoteAdmin(admin.ModelAdmin):
+    list_display = ('descricao', 'modelo', 'status', 'etapa', 'removidos', 'total_estimado', 'atualizado_em')
+    list_filter = ('status',)
+    ordering = ('-criado_em',)
+    readonly_fields = [f.name for f in ExclusaoEmLote._meta.fields]
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'status', 'prioridade', 'tentativas', 'trabalhador', 'criado_em', 'concluido_em')
+    list_filter = ('status', 'nome')
+    ordering = ('-criado_em',)
+    show_full_result_count = False
+    exclude = ('argumentos',)  # podem conter senhas
+    readonly_fields = [f.name for f in Tarefa._meta.fields if f.name != 'argumentos']
@@ -0,0 +1,41 @@
+"""
+Autenticação JWT sem consultar o banco para as leituras mais frequentes.
+
+JWTStatelessUserAuthentication valida só a assinatura e a validade do token:
+um usuário desativado (exclusão em lote, app/deletion.py, ou pelo admin)
+continuaria lendo até o access token expirar (ACCESS_TOKEN_LIFETIME). Para
+fechar essa janela, a desativação grava uma marca no cache do Django pelo
+tempo de vida do token, e JWTAtivoStatelessAuthentication recusa tokens de
+usuários marcados. Com vários workers o cache precisa ser compartilhado
+(DJANGO_CACHE_DIR); com o cache em memória a marca só vale no processo que
+desativou o usuário.
+
+"""
+
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+def chave_desativado(usuario_id):
+    return f'usuarios:desativado:{usuario_id}'
+
+
+def marcar_desativado(usuario_id):
+    """Recusa os tokens já emitidos para o usuário até que todos expirem."""
+    cache.set(chave_desativado(usuario_id), True, int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+
+
+def desmarcar_desativado(usuario_id):
+    cache.delete(chave_desativado(usuario_id))
+
+
+class JWTAtivoStatelessAuthentication(JWTStatelessUserAuthentication):
+    """Como JWTStatelessUserAuthentication, mas recusa usuários desativados (uma leitura de cache)."""
+
+    def get_user(self, validated_token):
+        usuario = super().get_user(validated_token)
+        if cache.get(chave_desativado(usuario.id)) is not None:
+            raise AuthenticationFailed('Usuário inativo.', code='user_inactive')
+        return usuario
@@ -0,0 +1,508 @@
+"""
+Snapshot da disponibilidade das salas compartilhado entre os processos.
+
+Uma cópia da ocupação das salas em memória em cada worker WSGI ocuparia
+memória em todos eles e divergiria entre eles. Aqui a ocupação fica num
+arquivo binário mapeado em memória (mmap) por todos os processos da máquina.
+As páginas pertencem ao cache do sistema operacional, então a memória de cada
+worker não cresce com o número de salas, e ler a disponibilidade não consulta
+o banco.
+
+Formato (ordem de bytes nativa; o arquivo é local à máquina):
+
+    cabeçalho (64 bytes): assinatura, versão, minutos por faixa, geração,
+        obsoleto, dias, primeiro dia (ordinal), capacidade, número de salas
+    ids:    capacidade x int64, IDs das salas em ordem crescente
+    linhas: capacidade x dias x uint64; em cada dia, um bit por faixa de 30
+            minutos ocupada (bit 0 = 00:00-00:30, horário local)
+
+Atualização (seqlock): o escritor trava o arquivo `.lock` (flock), deixa a
+geração ímpar, reescreve as linhas das salas afetadas com os dados do banco e
+deixa a geração par de novo. O leitor anota a geração, lê e confere: se ela
+mudou ou estava ímpar, lê de novo. Uma reconstrução (janela vencida ou falta
+de espaço para salas novas) grava um arquivo novo, troca com os.replace e
+marca o antigo como obsoleto; quem ainda o tem mapeado percebe e reabre.
+
+A leitura só consulta o banco quando precisa reconstruir o arquivo: na
+primeira vez e quando a janela vence (uma vez por dia). Sem fcntl (Windows)
+a trava vale só dentro do processo, o suficiente para o runserver.
+
+"""
+
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reserva, ReservaRecorrente, Sala
+from .recurrence import ocorrencias
+from .routers import alias_do_campus, campus_atual, campus_do_alias
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ASSINATURA = b'DISP'
+VERSAO = 1
+MINUTOS_FAIXA = 30
+FAIXAS_POR_DIA = 24 * 60 // MINUTOS_FAIXA  # 48: cabe num uint64
+
+CABECALHO = struct.Struct('=4sHHQIIIII')
+TAMANHO_CABECALHO = 64
+_GERACAO = struct.Struct('=Q')
+_POSICAO_GERACAO = 8
+_POSICAO_OBSOLETO = 16
+_POSICAO_SALAS = 32
+_U32 = struct.Struct('=I')
+
+Cabecalho = namedtuple(
+    'Cabecalho', 'assinatura versao minutos geracao obsoleto dias dia_inicial capacidade salas'
+)
+
+
+class SnapshotIndisponivel(Exception):
+    """O snapshot não pôde ser lido (escritas seguidas demais ou arquivo inválido)."""
+
+
+class ForaDaJanela(ValueError):
+    """A data pedida não está na janela de dias guardada no snapshot."""
+
+
+def configuracao():
+    return getattr(settings, 'DISPONIBILIDADE', {})
+
+
+def faixas(inicio, fim):
+    """Faixas [primeira, ultima) que cobrem os horários `inicio` e `fim` (datetime.time).
+
+    O início é arredondado para baixo e o fim para cima: uma sala só é livre
+    se todas as faixas que tocam o intervalo estão livres. `fim` igual a
+    00:00 significa o fim do dia.
+    """
+    de = inicio.hour * 60 + inicio.minute
+    ate = fim.hour * 60 + fim.minute + (1 if fim.second or fim.microsecond else 0)
+    if ate == 0:
+        ate = 24 * 60
+    return de // MINUTOS_FAIXA, -(-ate // MINUTOS_FAIXA)
+
+
+def mascara(primeira, ultima):
+    """Bits das faixas [primeira, ultima)."""
+    return ((1 << (ultima - primeira)) - 1) << primeira if ultima > primeira else 0
+
+
+def intervalos(bits):
+    """Converte os bits de um dia em intervalos (minuto inicial, minuto final) ocupados."""
+    resultado = []
+    faixa = 0
+    while bits >> faixa:
+        if bits >> faixa & 1:
+            primeira = faixa
+            while bits >> faixa & 1:
+                faixa += 1
+            resultado.append((primeira * MINUTOS_FAIXA, faixa * MINUTOS_FAIXA))
+        else:
+            faixa += 1
+    return resultado
+
+
+def _minutos(momento, arredondar=False):
+    extra = 1 if arredondar and (momento.second or momento.microsecond) else 0
+    return momento.hour * 60 + momento.minute + extra
+
+
+def _marcar(linha, dia_inicial, inicio, fim):
+    """Marca em `linha` (um inteiro por dia) as faixas ocupadas por [inicio, fim)."""
+    inicio, fim = timezone.localtime(inicio), timezone.localtime(fim)
+    dia = inicio.date()
+    while dia <= fim.date():
+        de = _minutos(inicio) if dia == inicio.date() else 0
+        ate = _minutos(fim, arredondar=True) if dia == fim.date() else 24 * 60
+        indice = (dia - dia_inicial).days
+        if 0 <= indice < len(linha):
+            linha[indice] |= mascara(de // MINUTOS_FAIXA, -(-ate // MINUTOS_FAIXA))
+        dia += timedelta(days=1)
+
+
+def ocupacao_no_banco(banco, sala_ids, dia_inicial, dias):
+    """Calcula no banco as linhas do snapshot: {sala_id: [bits de cada dia]}.
+
+    `sala_ids` None calcula todas as salas do banco que não estão sendo excluídas.
+    """
+    salas = Sala.objects.using(banco).filter(exclusao_pendente=False)
+    if sala_ids is not None:
+        salas = salas.filter(pk__in=sala_ids)
+    linhas = {pk: [0] * dias for pk in salas.values_list('pk', flat=True)}
+    if not linhas:
+        return linhas
+
+    ultimo_dia = dia_inicial + timedelta(days=dias - 1)
+    inicio = timezone.make_aware(datetime.combine(dia_inicial, datetime.min.time()))
+    fim = timezone.make_aware(datetime.combine(ultimo_dia + timedelta(days=1), datetime.min.time()))
+    avulsas = Reserva.objects.using(banco).filter(data_inicio__lt=fim, data_termino__gt=inicio)
+    regras = ReservaRecorrente.objects.using(banco).filter(data_inicio__lte=ultimo_dia, data_fim__gte=dia_inicial)
+    if sala_ids is not None:
+        avulsas = avulsas.filter(sala_reservada_id__in=list(linhas))
+        regras = regras.filter(sala_reservada_id__in=list(linhas))
+
+    for sala_id, data_inicio, data_termino in avulsas.values_list(
+        'sala_reservada_id', 'data_inicio', 'data_termino'
+    ).iterator():
+        if sala_id in linhas:
+            _marcar(linhas[sala_id], dia_inicial, data_inicio, data_termino)
+    for regra in regras.iterator():
+        if regra.sala_reservada_id in linhas:
+            for ocorrencia_inicio, ocorrencia_fim in ocorrencias(regra, inicio, fim):
+                _marcar(linhas[regra.sala_reservada_id], dia_inicial, ocorrencia_inicio, ocorrencia_fim)
+    return linhas
+
+
+class SnapshotDisponibilidade:
+    """Arquivo de disponibilidade de um campus, mapeado uma vez por processo."""
+
+    def __init__(self, codigo=None):
+        self.codigo = codigo
+        arquivo = Path(configuracao().get('ARQUIVO', settings.BASE_DIR / 'disponibilidade.bin'))
+        if codigo:
+            arquivo = arquivo.with_name(f'{arquivo.stem}_{codigo}{arquivo.suffix}')
+        self.caminho = arquivo
+        self._lock = threading.RLock()
+        self._trava = None
+        self._mapa = None
+
+    # Leitura
+
+    def ocupacao(self, sala_id, inicio, fim):
+        """Bits ocupados da sala em cada dia de `inicio` a `fim` (datas, inclusive).
+
+        Devolve (geração, [bits por dia]) ou (geração, None) se a sala não
+        está no snapshot.
+        """
+        def ler(mapa, cabecalho):
+            primeiro, ultimo = self._indices(cabecalho, inicio, fim)
+            posicao = self._posicao(mapa, cabecalho, sala_id)
+            if posicao is None:
+                return None
+            deslocamento = self._linha(cabecalho, posicao) + 8 * primeiro
+            with memoryview(mapa) as visao, visao[deslocamento:deslocamento + 8 * (ultimo - primeiro + 1)] as trecho:
+                with trecho.cast('Q') as bits:
+                    return bits.tolist()
+        return self._ler(ler)
+
+    def salas_livres(self, dia, primeira, ultima):
+        """IDs das salas sem nenhuma faixa [primeira, ultima) ocupada em `dia`.
+
+        Devolve (geração, [ids]).
+        """
+        procurada = mascara(primeira, ultima)
+
+        def ler(mapa, cabecalho):
+            indice, _ = self._indices(cabecalho, dia, dia)
+            total = cabecalho.salas
+            inicio_linhas = self._linha(cabecalho, 0)
+            with memoryview(mapa) as visao:
+                with visao[TAMANHO_CABECALHO:TAMANHO_CABECALHO + 8 * total] as trecho, trecho.cast('q') as ids:
+                    todos = ids.tolist()
+                with visao[inicio_linhas:inicio_linhas + 8 * total * cabecalho.dias] as trecho, \
+                        trecho.cast('Q') as linhas:
+                    # Um valor por sala: a coluna do dia, lida com passo de `dias`.
+                    coluna = linhas[indice::cabecalho.dias].tolist() if total else []
+            return [pk for pk, bits in zip(todos, coluna) if not bits & procurada]
+        return self._ler(ler)
+
+    def janela(self):
+        """Primeiro e último dia (date) guardados no snapshot."""
+        def ler(mapa, cabecalho):
+            primeiro = datetime.fromordinal(cabecalho.dia_inicial).date()
+            return primeiro, primeiro + timedelta(days=cabecalho.dias - 1)
+        return self._ler(ler)[1]
+
+    def _ler(self, leitura):
+        for _ in range(1000):
+            mapa = self._mapa
+            cabecalho = self._cabecalho(mapa) if mapa is not None else None
+            if cabecalho is None or cabecalho.obsoleto or self._vencido(cabecalho):
+                self._preparar()
+                continue
+            if cabecalho.geracao & 1:
+                time.sleep(0)  # escrita em andamento
+                continue
+            try:
+                resultado = leitura(mapa, cabecalho)
+            except ForaDaJanela:
+                raise
+            except (IndexError, TypeError, ValueError, struct.error):
+                # Lido no meio de uma escrita: lê de novo. Com a geração igual, o erro é real.
+                if _GERACAO.unpack_from(mapa, _POSICAO_GERACAO)[0] == cabecalho.geracao:
+                    raise
+                continue
+            if _GERACAO.unpack_from(mapa, _POSICAO_GERACAO)[0] == cabecalho.geracao:
+                return cabecalho.geracao, resultado
+        raise SnapshotIndisponivel(f'Snapshot de disponibilidade em escrita contínua: {self.caminho}')
+
+    def _indices(self, cabecalho, inicio, fim):
+        primeiro = inicio.toordinal() - cabecalho.dia_inicial
+        ultimo = fim.toordinal() - cabecalho.dia_inicial
+        if primeiro < 0 or ultimo >= cabecalho.dias or ultimo < primeiro:
+            raise ForaDaJanela('Data fora da janela do snapshot de disponibilidade.')
+        return primeiro, ultimo
+
+    def _posicao(self, mapa, cabecalho, sala_id):
+        with memoryview(mapa) as visao, \
+                visao[TAMANHO_CABECALHO:TAMANHO_CABECALHO + 8 * cabecalho.salas] as trecho, \
+                trecho.cast('q') as ids:
+            posicao = bisect.bisect_left(ids, sala_id)
+            if posicao < len(ids) and ids[posicao] == sala_id:
+                return posicao
+        return None
+
+    @staticmethod
+    def _linha(cabecalho, posicao):
+        return TAMANHO_CABECALHO + 8 * cabecalho.capacidade + 8 * cabecalho.dias * posicao
+
+    @staticmethod
+    def _cabecalho(mapa):
+        cabecalho = Cabecalho._make(CABECALHO.unpack_from(mapa, 0))
+        if cabecalho.assinatura != ASSINATURA or cabecalho.versao != VERSAO:
+            return None
+        return cabecalho
+
+    @staticmethod
+    def _vencido(cabecalho):
+        dias_passados = configuracao().get('DIAS_PASSADOS', 7)
+        return (
+            cabecalho.minutos != MINUTOS_FAIXA
+            or cabecalho.dias != configuracao().get('DIAS', 400)
+            or timezone.localdate().toordinal() - dias_passados > cabecalho.dia_inicial
+        )
+
+    # Mapeamento e reconstrução
+
+    def _mapear(self):
+        """Mapeia o arquivo atual do disco; None se não existe ou é inválido."""
+        try:
+            with open(self.caminho, 'r+b') as arquivo:
+                mapa = mmap.mmap(arquivo.fileno(), 0)
+        except (FileNotFoundError, ValueError):
+            return None
+        if len(mapa) < TAMANHO_CABECALHO or self._cabecalho(mapa) is None:
+            return None
+        return mapa
+
+    def _preparar(self):
+        """Troca o mapeamento obsoleto/vencido pelo arquivo atual, reconstruindo se preciso."""
+        with self._lock:
+            mapa = self._mapear()
+            cabecalho = self._cabecalho(mapa) if mapa is not None else None
+            if cabecalho is None or cabecalho.obsoleto or self._vencido(cabecalho):
+                with self._travado():
+                    mapa = self._mapa_para_escrita()
+            self._mapa = mapa
+
+    @contextmanager
+    def _travado(self):
+        """Trava exclusiva entre threads (RLock) e entre processos (flock no `.lock`)."""
+        with self._lock:
+            if self._trava is None:
+                self.caminho.parent.mkdir(parents=True, exist_ok=True)
+                self._trava = open(f'{self.caminho}.lock', 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._trava.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._trava.fileno(), fcntl.LOCK_UN)
+
+    def _mapa_para_escrita(self):
+        """Com a trava: o mapeamento do arquivo atual, reconstruído se ausente ou vencido."""
+        mapa = self._mapa
+        cabecalho = self._cabecalho(mapa) if mapa is not None else None
+        if cabecalho is None or cabecalho.obsoleto:
+            mapa = self._mapear()
+            cabecalho = self._cabecalho(mapa) if mapa is not None else None
+        if cabecalho is None or cabecalho.obsoleto or self._vencido(cabecalho):
+            mapa = self._reconstruir(mapa)
+        self._mapa = mapa
+        return mapa
+
+    def reconstruir(self):
+        """Recalcula o snapshot inteiro a partir do banco (ex.: `manage.py montar_disponibilidade`)."""
+        with self._travado():
+            mapa = self._mapa if self._mapa is not None else self._mapear()
+            self._mapa = self._reconstruir(mapa)
+            return self._cabecalho(self._mapa)
+
+    def _reconstruir(self, anterior):
+        """Grava um arquivo novo ao lado, troca pelo atual e marca o anterior como obsoleto."""
+        dias = configuracao().get('DIAS', 400)
+        dia_inicial = timezone.localdate() - timedelta(days=configuracao().get('DIAS_PASSADOS', 7))
+        linhas = ocupacao_no_banco(alias_do_campus(self.codigo), None, dia_inicial, dias)
+        ids = sorted(linhas)
+        capacidade = max(64, len(ids) + len(ids) // 2)
+        geracao = 0
+        if anterior is not None and self._cabecalho(anterior) is not None:
+            geracao = (self._cabecalho(anterior).geracao | 1) + 1
+
+        temporario = self.caminho.with_name(f'{self.caminho.name}.{os.getpid()}.tmp')
+        with open(temporario, 'wb') as arquivo:
+            cabecalho = CABECALHO.pack(ASSINATURA, VERSAO, MINUTOS_FAIXA, geracao, 0, dias,
+                                       dia_inicial.toordinal(), capacidade, len(ids))
+            arquivo.write(cabecalho.ljust(TAMANHO_CABECALHO, b'\0'))
+            arquivo.write(array('q', ids + [0] * (capacidade - len(ids))).tobytes())
+            for pk in ids:
+                arquivo.write(array('Q', linhas[pk]).tobytes())
+            arquivo.truncate(TAMANHO_CABECALHO + 8 * capacidade * (1 + dias))
+        os.replace(temporario, self.caminho)
+        if anterior is not None and len(anterior) >= TAMANHO_CABECALHO:
+            _U32.pack_into(anterior, _POSICAO_OBSOLETO, 1)
+        logger.info('Snapshot de disponibilidade reconstruído: %s (%s salas)', self.caminho, len(ids))
+        return self._mapear()
+
+    # Escrita
+
+    def atualizar_salas(self, sala_ids):
+        """Recalcula no banco as linhas das salas e grava no snapshot.
+
+        Salas novas são inseridas na ordem dos IDs; excluídas (ou marcadas para
+        exclusão) são removidas. Sem espaço para as novas, reconstrói o arquivo.
+        """
+        sala_ids = set(sala_ids)
+        if not sala_ids:
+            return
+        with self._travado():
+            mapa = self._mapa_para_escrita()
+            cabecalho = self._cabecalho(mapa)
+            dia_inicial = datetime.fromordinal(cabecalho.dia_inicial).date()
+            # Calculado com a trava: a última escrita sempre reflete o último commit.
+            linhas = ocupacao_no_banco(alias_do_campus(self.codigo), sala_ids, dia_inicial, cabecalho.dias)
+            with memoryview(mapa) as visao, \
+                    visao[TAMANHO_CABECALHO:TAMANHO_CABECALHO + 8 * cabecalho.salas] as trecho, \
+                    trecho.cast('q') as visao_ids:
+                ids = visao_ids.tolist()
+            novas = set(linhas) - set(ids)
+            if len(ids) + len(novas) > cabecalho.capacidade:
+                self._mapa = self._reconstruir(mapa)
+                return
+
+            self._marcar_geracao(mapa, cabecalho.geracao + 1)
+            try:
+                tamanho_linha = 8 * cabecalho.dias
+                for pk in sorted(sala_ids):
+                    posicao = bisect.bisect_left(ids, pk)
+                    existe = posicao < len(ids) and ids[posicao] == pk
+                    depois = len(ids) - posicao
+                    if pk not in linhas:
+                        if existe:
+                            mapa.move(TAMANHO_CABECALHO + 8 * posicao, TAMANHO_CABECALHO + 8 * (posicao + 1),
+                                      8 * (depois - 1))
+                            mapa.move(self._linha(cabecalho, posicao), self._linha(cabecalho, posicao + 1),
+                                      tamanho_linha * (depois - 1))
+                            ids.pop(posicao)
+                        continue
+                    if not existe:
+                        mapa.move(TAMANHO_CABECALHO + 8 * (posicao + 1), TAMANHO_CABECALHO + 8 * posicao,
+                                  8 * depois)
+                        mapa.move(self._linha(cabecalho, posicao + 1), self._linha(cabecalho, posicao),
+                                  tamanho_linha * depois)
+                        struct.pack_into('=q', mapa, TAMANHO_CABECALHO + 8 * posicao, pk)
+                        ids.insert(posicao, pk)
+                    inicio = self._linha(cabecalho, posicao)
+                    mapa[inicio:inicio + tamanho_linha] = array('Q', linhas[pk]).tobytes()
+                _U32.pack_into(mapa, _POSICAO_SALAS, len(ids))
+            finally:
+                self._marcar_geracao(mapa, cabecalho.geracao + 2)
+
+    @staticmethod
+    def _marcar_geracao(mapa, geracao):
+        _GERACAO.pack_into(mapa, _POSICAO_GERACAO, geracao)
+
+    def invalidar(self):
+        """Descarta o arquivo (ex.: após uma falha na escrita); a próxima leitura reconstrói."""
+        with self._travado():
+            mapa = self._mapa if self._mapa is not None else self._mapear()
+            if mapa is not None:
+                _U32.pack_into(mapa, _POSICAO_OBSOLETO, 1)
+            try:
+                os.remove(self.caminho)
+            except FileNotFoundError:
+                pass
+            self._mapa = None
+
+    def _apos_fork(self):
+        # A trava (flock) é do descritor: o processo filho precisa abrir o seu.
+        self._lock = threading.RLock()
+        self._trava = None
+
+
+_snapshots = {}
+_lock_snapshots = threading.Lock()
+
+
+def snapshot_do_campus(codigo=None):
+    """Snapshot de disponibilidade do campus (o do contexto atual se `codigo` for None)."""
+    codigo = codigo or campus_atual()
+    with _lock_snapshots:
+        if codigo not in _snapshots:
+            _snapshots[codigo] = SnapshotDisponibilidade(codigo)
+        return _snapshots[codigo]
+
+
+def snapshots_carregados():
+    with _lock_snapshots:
+        return list(_snapshots.values())
+
+
+def _reiniciar_apos_fork():
+    for snapshot in _snapshots.values():
+        snapshot._apos_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+
+
+def agendar_atualizacao(sala_ids, using):
+    """Atualiza as linhas das salas no snapshot depois do commit.
+
+    Várias alterações da mesma transação (ex.: um lote de exclusões) viram uma
+    única atualização com o conjunto das salas afetadas.
+    """
+    sala_ids = {pk for pk in sala_ids if pk is not None}
+    if not sala_ids:
+        return
+    conexao = transaction.get_connection(using)
+    pendente = getattr(conexao, '_disponibilidade_pendente', None)
+    if pendente is not None and any(item[1] is pendente for item in conexao.run_on_commit):
+        pendente.salas.update(sala_ids)
+        return
+
+    codigo = campus_do_alias(using)
+
+    def aplicar():
+        conexao._disponibilidade_pendente = None
+        snapshot = snapshot_do_campus(codigo)
+        try:
+            snapshot.atualizar_salas(aplicar.salas)
+        except Exception:
+            logger.exception('Falha ao atualizar o snapshot de disponibilidade; será reconstruído.')
+            snapshot.invalidar()
+
+    aplicar.salas = sala_ids
+    conexao._disponibilidade_pendente = aplicar
+    transaction.on_commit(aplicar, using=using)
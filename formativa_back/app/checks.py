@@ -0,0 +1,83 @@
+"""
+Checagens de sistema (manage.py check) para configurações que degradam o
+desempenho em produção.
+
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register, run_checks
+from django.core.exceptions import ImproperlyConfigured
+
+TAG_DESEMPENHO = 'desempenho'
+
+
+@register(TAG_DESEMPENHO, Tags.database)
+def checar_configuracoes_de_desempenho(app_configs, **kwargs):
+    """Falha quando o perfil de produção roda com configurações inseguras."""
+    erros = []
+    producao = getattr(settings, 'PRODUCTION', False)
+
+    if producao and settings.DEBUG:
+        erros.append(Error(
+            'DEBUG está ligado no perfil de produção.',
+            hint='Com DEBUG o Django guarda todas as queries em memória. Remova DJANGO_DEBUG.',
+            id='app.E001',
+        ))
+
+    for alias, banco in settings.DATABASES.items():
+        pool = bool(banco.get('OPTIONS', {}).get('pool'))
+        # DB_POOL só vira OPTIONS['pool'] no PostgreSQL; nos outros o pedido seria ignorado.
+        pedido = pool or (alias == 'default' and getattr(settings, 'DB_POOL', False))
+        if pedido and not banco['ENGINE'].endswith('postgresql'):
+            erros.append(Error(
+                f"O banco '{alias}' pede pool de conexões, mas o backend não suporta.",
+                hint='O pool nativo do Django só existe para PostgreSQL; use DB_CONN_MAX_AGE.',
+                id='app.E002',
+            ))
+        conn_max_age = banco.get('CONN_MAX_AGE', 0)
+        if producao and not pool and conn_max_age == 0:
+            erros.append(Error(
+                f"O banco '{alias}' abre uma conexão nova a cada request (CONN_MAX_AGE = 0).",
+                hint='Defina DB_CONN_MAX_AGE (ex.: 600) ou ligue DB_POOL.',
+                id='app.E003',
+            ))
+        if conn_max_age is None and not banco.get('CONN_HEALTH_CHECKS'):
+            erros.append(Warning(
+                f"O banco '{alias}' mantém conexões para sempre sem health checks.",
+                hint='Ligue DB_CONN_HEALTH_CHECKS para descartar conexões quebradas.',
+                id='app.W004',
+            ))
+
+    cache_local = settings.CACHES['default']['BACKEND'].endswith('LocMemCache')
+    if producao and getattr(settings, 'DATABASE_REPLICAS', {}) and cache_local:
+        erros.append(Warning(
+            'As réplicas de leitura usam o cache em memória do processo.',
+            hint='Com vários workers, a leitura após escrita pode cair numa réplica atrasada. '
+                 'Defina DJANGO_CACHE_DIR para compartilhar o cache.',
+            id='app.W005',
+        ))
+
+    replicas = getattr(settings, 'REPLICAS', {})
+    fixacao, atraso = replicas.get('FIXAR_APOS_ESCRITA', 10), replicas.get('ATRASO_MAXIMO', 10)
+    if getattr(settings, 'DATABASE_REPLICAS', {}) and fixacao < atraso:
+        erros.append(Error(
+            f'As leituras ficam no primário por {fixacao}s após uma escrita, '
+            f'mas as réplicas podem atrasar até {atraso}s.',
+            hint='Uma réplica saudável ainda pode não ter a escrita do usuário. '
+                 'Defina DB_REPLICA_FIXACAO com pelo menos o ATRASO_MAXIMO das réplicas.',
+            id='app.E006',
+        ))
+    return erros
+
+
+def verificar_inicializacao():
+    """Executa as checagens de desempenho ao subir o servidor em produção.
+
+    O gunicorn/uvicorn não roda o `manage.py check`, então system/wsgi.py e
+    system/asgi.py chamam esta função antes de aceitar requests.
+    """
+    if not getattr(settings, 'PRODUCTION', False):
+        return
+    erros = [m for m in run_checks(tags=[TAG_DESEMPENHO]) if m.is_serious()]
+    if erros:
+        raise ImproperlyConfigured('\n'.join(str(e) for e in erros))
@@ -0,0 +1,161 @@
+"""
+Exclusão em lotes de usuários e salas.
+
+Excluir um professor apaga em cascata a sala dele, todas as reservas dessa
+sala e as reservas do próprio professor. Feito de uma vez pelo collector do
+Django, isso carrega todas as linhas em memória numa única transação. Aqui o
+objeto é apenas marcado (`exclusao_pendente`) durante o request e os
+dependentes são removidos depois, pela fila de tarefas (tarefa
+`exclusao_em_lote`), em lotes de EXCLUSAO_LOTE linhas, cada um na sua
+transação, com o progresso gravado em ExclusaoEmLote.
+
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Usuario, Sala, Disciplina, Reserva, ReservaRecorrente, ExclusaoEmLote
+from .search import indice_do_campus, indices_carregados, USUARIO, SALA
+from .routers import alias_do_campus, campi, campus_atual
+from .jobs import enfileirar
+from .availability import agendar_atualizacao
+from .authentication import marcar_desativado
+
+logger = logging.getLogger(__name__)
+
+
+def _etapas(exclusao):
+    """Lista (nome, queryset, acao) na ordem em que os dependentes são tratados.
+
+    Um usuário é global e pode ter salas e reservas em todos os campi; uma
+    sala só tem dependentes no banco do próprio campus.
+    """
+    if exclusao.modelo == 'usuario':
+        etapas = []
+        for codigo in campi() or [None]:
+            banco = alias_do_campus(codigo)
+            sufixo = f'@{codigo}' if codigo else ''
+            # Etapas separadas (em vez de um OR) para cada uma usar seu índice.
+            dono = Q(professor_id=exclusao.objeto_id)
+            salas_do_dono = Q(sala_reservada__professor_id=exclusao.objeto_id)
+            etapas += [
+                (f'reservas{sufixo}', Reserva.objects.using(banco).filter(dono), 'excluir'),
+                (f'reservas_das_salas{sufixo}',
+                 Reserva.objects.using(banco).filter(salas_do_dono).exclude(dono), 'excluir'),
+                (f'reservas_recorrentes{sufixo}', ReservaRecorrente.objects.using(banco).filter(dono), 'excluir'),
+                (f'reservas_recorrentes_das_salas{sufixo}',
+                 ReservaRecorrente.objects.using(banco).filter(salas_do_dono).exclude(dono), 'excluir'),
+                (f'disciplinas{sufixo}', Disciplina.objects.using(banco).filter(dono), 'desvincular'),
+                (f'salas{sufixo}', Sala.objects.using(banco).filter(dono), 'excluir'),
+            ]
+        return etapas
+    banco = alias_do_campus(exclusao.campus or None)
+    sala = Q(sala_reservada_id=exclusao.objeto_id)
+    return [
+        ('reservas', Reserva.objects.using(banco).filter(sala), 'excluir'),
+        ('reservas_recorrentes', ReservaRecorrente.objects.using(banco).filter(sala), 'excluir'),
+    ]
+
+
+def _objeto(exclusao):
+    if exclusao.modelo == 'usuario':
+        return Usuario.objects.filter(pk=exclusao.objeto_id)
+    return Sala.objects.using(alias_do_campus(exclusao.campus or None)).filter(pk=exclusao.objeto_id)
+
+
+def agendar_exclusao(objeto, solicitado_por=None):
+    """Marca o objeto para exclusão e registra o acompanhamento.
+
+    Roda dentro do request: só faz um UPDATE e dois INSERTs (acompanhamento
+    e tarefa), independente de quantas linhas dependem do objeto.
+    """
+    modelo = 'usuario' if isinstance(objeto, Usuario) else 'sala'
+    with transaction.atomic():
+        campos = {'exclusao_pendente': True}
+        if modelo == 'usuario':
+            campos['is_active'] = False  # impede novos logins e tokens
+        type(objeto).objects.using(objeto._state.db).filter(pk=objeto.pk).update(**campos)
+        exclusao = ExclusaoEmLote.objects.create(
+            modelo=modelo,
+            objeto_id=objeto.pk,
+            campus='' if modelo == 'usuario' else (campus_atual() or ''),
+            descricao=str(objeto)[:255],
+            solicitado_por=solicitado_por,
+        )
+        # O UPDATE não dispara post_save, então tira o objeto da busca aqui.
+        if modelo == 'usuario':
+            indices, tipo = indices_carregados(), USUARIO
+            # O UPDATE também não passa por signals.marcar_usuario_desativado.
+            transaction.on_commit(lambda: marcar_desativado(objeto.pk))
+        else:
+            indices, tipo = [indice_do_campus()], SALA
+        transaction.on_commit(lambda: [indice.remover(tipo, objeto.pk) for indice in indices])
+        if modelo == 'sala':
+            agendar_atualizacao([objeto.pk], objeto._state.db)  # a sala some da disponibilidade
+        enfileirar('exclusao_em_lote', args=[exclusao.pk], solicitado_por=solicitado_por)
+    return exclusao
+
+
+def processar_exclusao(exclusao_id, tamanho_lote=None, parada_ha=None):
+    """Remove os dependentes em lotes e, por fim, o próprio objeto.
+
+    Pode ser chamada de novo para uma exclusão interrompida: cada etapa apenas
+    consulta o que ainda resta. Uma exclusão EXECUTANDO sem progresso há
+    `parada_ha` minutos (EXCLUSAO_PARADA_HA) é tida como abandonada e assumida.
+    Devolve None se a exclusão não pôde ser assumida (concluída ou com outro
+    executor ativo).
+    """
+    tamanho_lote = tamanho_lote or getattr(settings, 'EXCLUSAO_LOTE', 500)
+    if parada_ha is None:
+        parada_ha = getattr(settings, 'EXCLUSAO_PARADA_HA', 10)
+    agora = timezone.now()
+    # Garante um único executor por exclusão.
+    assumida = ExclusaoEmLote.objects.filter(
+        Q(status__in=('PENDENTE', 'ERRO')) | Q(status='EXECUTANDO', atualizado_em__lt=agora - timedelta(minutes=parada_ha)),
+        pk=exclusao_id,
+    ).update(status='EXECUTANDO', erro='', atualizado_em=agora)
+    if not assumida:
+        return None
+    exclusao = ExclusaoEmLote.objects.get(pk=exclusao_id)
+
+    try:
+        if not exclusao.total_estimado:
+            exclusao.total_estimado = estimar_dependentes(exclusao)
+            exclusao.save(update_fields=['total_estimado', 'atualizado_em'])
+        for etapa, queryset, acao in _etapas(exclusao):
+            exclusao.etapa = etapa
+            exclusao.save(update_fields=['etapa', 'atualizado_em'])
+            while True:
+                ids = list(queryset.order_by().values_list('pk', flat=True)[:tamanho_lote])
+                if not ids:
+                    break
+                with transaction.atomic(using=queryset.db):
+                    lote = queryset.model.objects.using(queryset.db).filter(pk__in=ids)
+                    if acao == 'desvincular':
+                        lote.update(professor=None)
+                    else:
+                        lote.delete()
+                exclusao.removidos += len(ids)
+                exclusao.save(update_fields=['removidos', 'atualizado_em'])
+
+        exclusao.etapa = 'objeto'
+        _objeto(exclusao).delete()
+        exclusao.status = 'CONCLUIDA'
+        exclusao.concluido_em = timezone.now()
+        exclusao.save(update_fields=['etapa', 'status', 'concluido_em', 'atualizado_em'])
+    except Exception as erro:
+        logger.exception('Falha na exclusão em lote %s', exclusao_id)
+        exclusao.status = 'ERRO'
+        exclusao.erro = str(erro)
+        exclusao.save(update_fields=['status', 'erro', 'atualizado_em'])
+    return exclusao
+
+
+def estimar_dependentes(exclusao):
+    """Conta as linhas que a exclusão vai remover ou desvincular."""
+    return sum(queryset.count() for _, queryset, _ in _etapas(exclusao))
@@ -0,0 +1,109 @@
+"""
+Hub de eventos em memória para o stream (SSE) de reservas.
+
+Os sinais do modelo Reserva publicam eventos aqui e cada conexão SSE aberta
+recebe uma fila própria. O hub vive no processo ASGI, então as escritas precisam
+acontecer no mesmo processo que serve o stream.
+
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class Assinatura:
+    """Fila de eventos de uma conexão SSE.
+
+    Guarda apenas o necessário para filtrar os eventos por papel (Gestor recebe
+    tudo, Professor só as próprias reservas). Se o cliente ficar lento e a fila
+    encher, os eventos mais antigos são descartados e o cliente é avisado.
+    """
+    __slots__ = ('loop', 'usuario_id', 'gestor', 'campus', 'eventos', 'sinal', 'perdidos')
+
+    def __init__(self, loop, usuario_id, gestor, campus, limite):
+        self.loop = loop
+        self.usuario_id = usuario_id
+        self.gestor = gestor
+        self.campus = campus
+        self.eventos = deque(maxlen=limite)
+        self.sinal = asyncio.Event()
+        self.perdidos = 0
+
+    def aceita(self, evento):
+        """Só eventos do campus; gestores recebem todos, professores só os próprios."""
+        if evento['campus'] != self.campus:
+            return False
+        return self.gestor or evento['professor'] == self.usuario_id
+
+    def _entregar(self, evento):
+        # Executado sempre dentro do loop da conexão.
+        if len(self.eventos) == self.eventos.maxlen:
+            self.perdidos += 1
+        self.eventos.append(evento)
+        self.sinal.set()
+
+    async def proximos(self, timeout):
+        """Aguarda até `timeout` segundos e devolve os eventos pendentes."""
+        if not self.eventos:
+            self.sinal.clear()
+            try:
+                await asyncio.wait_for(self.sinal.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        pendentes = list(self.eventos)
+        self.eventos.clear()
+        return pendentes
+
+
+class HubReservas:
+    """Distribui eventos de Reserva para as conexões SSE abertas no processo."""
+
+    def __init__(self):
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._assinaturas)
+
+    def assinar(self, usuario_id, gestor, campus=None, limite=100):
+        """Registra uma nova conexão no loop atual e devolve sua assinatura."""
+        assinatura = Assinatura(asyncio.get_running_loop(), usuario_id, gestor, campus, limite)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        """Remove a conexão do hub (cliente desconectou)."""
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, tipo, dados, professor_id, campus=None):
+        """Publica um evento para as assinaturas interessadas.
+
+        Pode ser chamado de qualquer thread: a entrega é agendada no loop de
+        cada conexão com `call_soon_threadsafe`.
+        """
+        evento = {
+            'id': next(self._ids),
+            'tipo': tipo,
+            'professor': professor_id,
+            'campus': campus,
+            'dados': dados,
+            'publicado_em': time.perf_counter(),
+        }
+        with self._lock:
+            destinos = [a for a in self._assinaturas if a.aceita(evento)]
+        for assinatura in destinos:
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura._entregar, evento)
+            except RuntimeError:
+                # Loop já encerrado: a conexão morreu sem cancelar.
+                self.cancelar(assinatura)
+        return evento
+
+
+hub_reservas = HubReservas()
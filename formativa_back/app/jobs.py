@@ -0,0 +1,207 @@
+"""
+Fila de tarefas no próprio banco, sem broker externo.
+
+As funções registradas com `@tarefa` (ver app/tasks.py) são enfileiradas
+como linhas de Tarefa e executadas pelo `manage.py worker`, que assume as
+linhas com um UPDATE condicional (funciona em MySQL, PostgreSQL e SQLite, sem
+SELECT ... FOR UPDATE) e as roda num pool de processos.
+
+Ordem: maior `prioridade` primeiro e, empatado, a mais antiga. Uma falha
+devolve a tarefa para a fila depois de ESPERA_BASE * 2^(tentativa - 1)
+segundos, até `max_tentativas`.
+
+Em desenvolvimento (TAREFAS['NO_PROCESSO']) a tarefa também roda numa thread
+do próprio servidor logo após o commit, para não exigir o worker.
+
+"""
+
+import functools
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarefa
+from .routers import campus_atual, usar_campus
+
+logger = logging.getLogger(__name__)
+
+_registro = {}
+
+
+def configuracao():
+    return getattr(settings, 'TAREFAS', {})
+
+
+def _fila():
+    # A fila é lida sempre do primário: uma réplica atrasada poderia não ter a tarefa.
+    return Tarefa.objects.using(DEFAULT_DB_ALIAS)
+
+
+def tarefa(nome, prioridade=0, max_tentativas=3, sensivel=False):
+    """Registra a função como tarefa e adiciona `funcao.enfileirar(...)`.
+
+    `sensivel`: os argumentos (ex.: senhas) são apagados do banco quando a
+    tarefa termina, com sucesso ou erro definitivo.
+    """
+    def registrar(funcao):
+        funcao.nome_tarefa = nome
+        funcao.opcoes_tarefa = {
+            'prioridade': prioridade, 'max_tentativas': max_tentativas, 'sensivel': sensivel,
+        }
+        funcao.enfileirar = functools.partial(enfileirar, nome)
+        _registro[nome] = funcao
+        return funcao
+    return registrar
+
+
+def registradas():
+    return dict(_registro)
+
+
+def enfileirar(nome, args=(), kwargs=None, prioridade=None, solicitado_por=None):
+    """Grava a tarefa na fila e devolve a linha criada.
+
+    Participa da transação atual: se o request falhar, a tarefa some junto.
+    """
+    funcao = _registro[nome]
+    opcoes = funcao.opcoes_tarefa
+    nova = _fila().create(
+        nome=nome,
+        argumentos={'args': list(args), 'kwargs': kwargs or {}},
+        campus=campus_atual() or '',
+        prioridade=opcoes['prioridade'] if prioridade is None else prioridade,
+        max_tentativas=opcoes['max_tentativas'],
+        solicitado_por=solicitado_por,
+    )
+    if configuracao().get('NO_PROCESSO'):
+        transaction.on_commit(lambda: executar_em_thread(nova.pk))
+    return nova
+
+
+def assumir(trabalhador, limite):
+    """Assume até `limite` tarefas prontas e devolve seus IDs.
+
+    Cada linha só é assumida se ainda estiver PENDENTE no momento do UPDATE,
+    então dois workers nunca executam a mesma tarefa.
+    """
+    agora = timezone.now()
+    candidatas = list(
+        _fila().filter(status='PENDENTE', executar_apos__lte=agora)
+        .order_by('-prioridade', 'executar_apos', 'pk')
+        .values_list('pk', flat=True)[:limite * 2]
+    )
+    assumidas = []
+    for pk in candidatas:
+        if _assumir(pk, trabalhador, agora):
+            assumidas.append(pk)
+            if len(assumidas) == limite:
+                break
+    return assumidas
+
+
+def _assumir(pk, trabalhador, agora=None):
+    return _fila().filter(pk=pk, status='PENDENTE').update(
+        status='EXECUTANDO',
+        tentativas=F('tentativas') + 1,
+        trabalhador=trabalhador[:100],
+        iniciado_em=agora or timezone.now(),
+        atualizado_em=agora or timezone.now(),
+        erro='',
+    )
+
+
+def espera_para(tentativa):
+    """Segundos até a próxima tentativa depois da falha número `tentativa`."""
+    base = configuracao().get('ESPERA_BASE', 5)
+    return min(base * 2 ** (tentativa - 1), configuracao().get('ESPERA_MAXIMA', 600))
+
+
+def executar_tarefa(pk):
+    """Executa uma tarefa já assumida e grava o resultado ou a falha."""
+    registro = _fila().get(pk=pk)
+    funcao = _registro.get(registro.nome)
+    if funcao is None:
+        registrar_falha(pk, f'Tarefa não registrada: {registro.nome}', definitiva=True)
+        return 'ERRO'
+    try:
+        with usar_campus(registro.campus or None):
+            resultado = funcao(*registro.argumentos.get('args', []), **registro.argumentos.get('kwargs', {}))
+    except Exception:
+        logger.exception('Falha na tarefa %s (%s)', pk, registro.nome)
+        return registrar_falha(pk, traceback.format_exc())
+    campos = {'status': 'CONCLUIDA', 'resultado': resultado, 'concluido_em': timezone.now()}
+    if funcao.opcoes_tarefa['sensivel']:
+        campos['argumentos'] = {}
+    _fila().filter(pk=pk).update(atualizado_em=timezone.now(), **campos)
+    return 'CONCLUIDA'
+
+
+def registrar_falha(pk, erro, definitiva=False):
+    """Volta a tarefa para a fila com espera crescente ou marca o erro definitivo."""
+    registro = _fila().get(pk=pk)
+    agora = timezone.now()
+    registro.erro = str(erro)
+    if not definitiva and registro.tentativas < registro.max_tentativas:
+        registro.status = 'PENDENTE'
+        registro.executar_apos = agora + timedelta(seconds=espera_para(registro.tentativas))
+    else:
+        registro.status = 'ERRO'
+        registro.concluido_em = agora
+        funcao = _registro.get(registro.nome)
+        if funcao is not None and funcao.opcoes_tarefa['sensivel']:
+            registro.argumentos = {}
+    registro.save(update_fields=['status', 'erro', 'executar_apos', 'concluido_em', 'argumentos', 'atualizado_em'])
+    return registro.status
+
+
+def recuperar_paradas(minutos):
+    """Devolve à fila as tarefas presas em EXECUTANDO (worker morreu no meio).
+
+    O worker atualiza `atualizado_em` das tarefas em execução periodicamente;
+    ficar `minutos` sem atualização significa que ninguém mais cuida dela.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    paradas = _fila().filter(status='EXECUTANDO', atualizado_em__lt=limite)
+    esgotadas = paradas.filter(tentativas__gte=F('max_tentativas'))
+    campos = {'status': 'ERRO', 'erro': 'Execução interrompida.', 'concluido_em': timezone.now()}
+    # O erro é definitivo: como em registrar_falha, os argumentos sensíveis são apagados.
+    sensiveis = [nome for nome, funcao in _registro.items() if funcao.opcoes_tarefa['sensivel']]
+    total = esgotadas.filter(nome__in=sensiveis).update(argumentos={}, **campos)
+    total += esgotadas.update(**campos)
+    return total + paradas.update(status='PENDENTE', erro='Execução interrompida.')
+
+
+def ha_tarefas_prontas():
+    return _fila().filter(status='PENDENTE', executar_apos__lte=timezone.now()).exists()
+
+
+def sinalizar_execucao(pks):
+    """Atualiza `atualizado_em` das tarefas em execução para não serem tidas como paradas."""
+    return _fila().filter(pk__in=pks, status='EXECUTANDO').update(atualizado_em=timezone.now())
+
+
+def executar_em_thread(pk):
+    """Assume e executa a tarefa numa thread do processo atual (sem worker)."""
+    def executar():
+        try:
+            if _assumir(pk, f'thread:{threading.get_ident()}'):
+                executar_tarefa(pk)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=executar, name=f'tarefa-{pk}', daemon=True).start()
+
+
+def executar_no_processo(pk):
+    """Ponto de entrada de cada tarefa dentro de um processo do pool do worker."""
+    close_old_connections()
+    try:
+        return executar_tarefa(pk)
+    finally:
+        close_old_connections()
@@ -0,0 +1,127 @@
+"""
+Benchmark do admin de usuários com a tabela no tamanho de produção.
+
+Cria usuários de teste (1 milhão por padrão, com bulk_create em lotes), entra
+no admin com um superusuário e mede a listagem de usuários, o filtro por tipo
+e a busca por prefixo de username, por prefixo de e-mail, por NI numérico e
+por um termo não numérico. Para cada busca mostra o plano de execução do
+banco e confere o SQL: o NI só entra na consulta como igualdade e só quando o
+termo tem apenas dígitos (um termo como "abc" não pode virar uma comparação
+com a coluna inteira, que varreria a tabela).
+
+No SQLite o LIKE não diferencia maiúsculas e não usa o índice de username e
+e-mail, então as buscas percorrem o índice inteiro; no MySQL (collation
+case-insensitive) o prefixo usa o índice.
+
+Falha se alguma página responder com erro ou passar de --maximo ms. Os
+usuários de teste são removidos no fim (com --manter ficam para a próxima
+execução, que só cria os que faltam).
+
+Uso: python manage.py bench_admin [--usuarios 1000000] [--repeticoes 5] [--maximo 1000]
+
+"""
+
+import statistics
+import time
+
+from django.contrib.admin.sites import site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.models import Usuario
+
+PREFIXO = 'bench_admin_'
+NI_BASE = 1_800_000_000
+LOTE = 10000
+
+
+class Command(BaseCommand):
+    help = 'Mede a listagem e as buscas do admin de usuários com a tabela cheia.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1_000_000, help='Usuários de teste na tabela.')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Requests por página medida.')
+        parser.add_argument('--maximo', type=float, default=1000.0, help='Limite da mediana em ms.')
+        parser.add_argument('--manter', action='store_true', help='Não remove os usuários de teste no fim.')
+
+    def handle(self, *args, **options):
+        self._semear(options['usuarios'])
+        admin = Usuario.objects.create_superuser(f'{PREFIXO}admin', None, None, ni=NI_BASE - 1, tipo='GESTOR')
+        try:
+            cliente = Client()
+            cliente.force_login(admin)
+            url = reverse('admin:app_usuario_changelist')
+            meio = options['usuarios'] // 2
+            paginas = [
+                ('listagem', {}, None),
+                ('filtro por tipo', {'tipo__exact': 'GESTOR'}, None),
+                ('username (prefixo)', {'q': f'{PREFIXO}{meio:07d}'[:-2]}, False),
+                ('e-mail (prefixo)', {'q': f'{PREFIXO}{meio:07d}@'}, False),
+                ('NI numérico', {'q': str(NI_BASE + meio)}, True),
+                ('termo não numérico', {'q': 'abc'}, False),
+            ]
+            lentas = []
+            for nome, parametros, usa_ni in paginas:
+                plano = self._conferir_sql(parametros['q'], usa_ni) if 'q' in parametros else ''
+                mediana = self._medir(cliente, url, parametros, options['repeticoes'])
+                self.stdout.write(f'{nome:<22} {mediana:8.1f} ms')
+                for linha in plano.splitlines():
+                    self.stdout.write(f'    {linha}')
+                if mediana > options['maximo']:
+                    lentas.append(nome)
+        finally:
+            admin.delete()
+            if not options['manter']:
+                self._limpar()
+
+        if lentas:
+            raise CommandError(f'Acima de {options["maximo"]:.0f} ms: {", ".join(lentas)}')
+        self.stdout.write(self.style.SUCCESS(f'Admin de usuários dentro de {options["maximo"]:.0f} ms.'))
+
+    def _semear(self, total):
+        existentes = Usuario.objects.filter(username__startswith=PREFIXO).count()
+        inicio = time.perf_counter()
+        for primeiro in range(existentes, total, LOTE):
+            Usuario.objects.bulk_create([
+                Usuario(username=f'{PREFIXO}{i:07d}', email=f'{PREFIXO}{i:07d}@escola.test', ni=NI_BASE + i,
+                        tipo='GESTOR' if i % 20 == 0 else 'PROFESSOR', password='!')
+                for i in range(primeiro, min(primeiro + LOTE, total))
+            ])
+        self.stdout.write(f'{total} usuários de teste ({max(total - existentes, 0)} criados em '
+                          f'{time.perf_counter() - inicio:.1f}s)')
+
+    def _medir(self, cliente, url, parametros, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resposta = cliente.get(url, parametros)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code != 200:
+                raise CommandError(f'{url}?{resposta.request["QUERY_STRING"]} respondeu {resposta.status_code}.')
+        return statistics.median(tempos)
+
+    def _conferir_sql(self, termo, usa_ni):
+        """Confere como o NI aparece no SQL da busca e devolve o plano de execução."""
+        model_admin = site._registry[Usuario]
+        requisicao = RequestFactory().get('/', {'q': termo})
+        consulta, _ = model_admin.get_search_results(requisicao, Usuario.objects.order_by('username'), termo)
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as capturadas:
+            plano = consulta[:100].explain()
+        filtro = capturadas.captured_queries[-1]['sql'].partition(' WHERE ')[2]
+        coluna = connections[DEFAULT_DB_ALIAS].ops.quote_name('ni')
+        if usa_ni and f'{coluna} = ' not in filtro:
+            raise CommandError(f'A busca por "{termo}" não compara o NI por igualdade: {filtro}')
+        if not usa_ni and coluna in filtro:
+            raise CommandError(f'A busca por "{termo}" compara o NI com um termo não numérico: {filtro}')
+        return plano
+
+    def _limpar(self):
+        # delete() do ORM carregaria um milhão de objetos para os sinais e as
+        # relações; os usuários de teste não têm reservas nem grupos.
+        tabela = connections[DEFAULT_DB_ALIAS].ops.quote_name(Usuario._meta.db_table)
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {tabela} WHERE username LIKE %s ESCAPE '!'",
+                           [PREFIXO.replace('_', '!_') + '%'])
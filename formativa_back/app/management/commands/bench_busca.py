@@ -0,0 +1,76 @@
+"""
+Benchmark da busca typeahead (app/search.py).
+
+Monta um índice com usuários, salas e disciplinas sintéticos e mede a latência
+de consultas por prefixo, como as digitadas nos formulários do front.
+
+Uso: python manage.py bench_busca --usuarios 50000 --consultas 5000
+
+"""
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.search import IndiceBusca, termos, USUARIO, SALA, DISCIPLINA
+
+NOMES = ['Ana', 'João', 'Maria', 'José', 'Lucas', 'Júlia', 'Pedro', 'Beatriz', 'Carlos', 'Fernanda',
+         'Rafael', 'Larissa', 'Marcos', 'Camila', 'Tiago', 'Patrícia', 'Bruno', 'Letícia', 'Diego', 'Renata']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Pereira', 'Costa', 'Rodrigues', 'Almeida',
+              'Nascimento', 'Lima', 'Araújo', 'Fernandes', 'Carvalho', 'Gomes', 'Martins', 'Rocha']
+CURSOS = ['Desenvolvimento de Sistemas', 'Mecatrônica', 'Eletrotécnica', 'Logística', 'Química']
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência (p50/p99) da busca typeahead com dados sintéticos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=50000)
+        parser.add_argument('--salas', type=int, default=500)
+        parser.add_argument('--disciplinas', type=int, default=1000)
+        parser.add_argument('--consultas', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(options['seed'])
+        documentos = []
+        for pk in range(1, options['usuarios'] + 1):
+            nome, sobrenome = aleatorio.choice(NOMES), aleatorio.choice(SOBRENOMES)
+            username = f'{nome}.{sobrenome}{pk}'.lower()
+            documentos.append((USUARIO, pk, f'{nome} {sobrenome} ({username})',
+                               termos(username, nome, sobrenome, 100000 + pk, username)))
+        for pk in range(1, options['salas'] + 1):
+            documentos.append((SALA, pk, f'Sala {pk}', termos(f'Lab {pk}')))
+        for pk in range(1, options['disciplinas'] + 1):
+            curso = aleatorio.choice(CURSOS)
+            documentos.append((DISCIPLINA, pk, f'Disciplina {pk} ({curso})',
+                               termos(f'Disciplina {pk}', curso)))
+
+        indice = IndiceBusca()
+        inicio = time.perf_counter()
+        indice.construir(documentos)
+        self.stdout.write(f'Índice com {len(indice)} documentos montado em '
+                          f'{(time.perf_counter() - inicio) * 1000:.0f} ms')
+
+        consultas = []
+        for _ in range(options['consultas']):
+            palavra = aleatorio.choice(NOMES + SOBRENOMES + CURSOS).split()[0]
+            normalizada = palavra[:aleatorio.randint(1, len(palavra))]
+            if aleatorio.random() < 0.3:
+                normalizada += ' ' + aleatorio.choice(SOBRENOMES)[:3]
+            consultas.append(normalizada)
+
+        latencias = []
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            indice.buscar(consulta, limite=10)
+            latencias.append(time.perf_counter() - inicio)
+
+        latencias.sort()
+        p99 = latencias[int(len(latencias) * 0.99) - 1]
+        self.stdout.write(f'Consultas: {len(latencias)}')
+        self.stdout.write(f'p50: {statistics.median(latencias) * 1000:.3f} ms')
+        self.stdout.write(f'p99: {p99 * 1000:.3f} ms')
+        self.stdout.write(f'máx: {latencias[-1] * 1000:.3f} ms')
@@ -0,0 +1,62 @@
+"""
+Benchmark do custo de abrir conexão com o banco a cada request.
+
+Simula o ciclo de vida de um request (request_started -> query ->
+request_finished) com CONN_MAX_AGE = 0 e com conexões persistentes, e mostra
+quanto do tempo por request era gasto apenas conectando.
+
+Uso: python manage.py bench_conexoes --requests 500 [--database default]
+
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from app.models import Reserva
+
+
+class Command(BaseCommand):
+    help = 'Compara o tempo por request com e sem conexões persistentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests simulados por modo.')
+        parser.add_argument('--database', default='default', help='Alias do banco a medir.')
+        parser.add_argument('--conn-max-age', type=int, default=600,
+                            help='CONN_MAX_AGE usado no modo persistente.')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        conexao = connections[alias]
+        original = conexao.settings_dict['CONN_MAX_AGE']
+        try:
+            sem_persistencia = self._medir(conexao, 0, options['requests'])
+            persistente = self._medir(conexao, options['conn_max_age'], options['requests'])
+        finally:
+            conexao.close()
+            conexao.settings_dict['CONN_MAX_AGE'] = original
+
+        for nome, (tempo, conexoes) in (
+            ('CONN_MAX_AGE=0', sem_persistencia),
+            (f"CONN_MAX_AGE={options['conn_max_age']}", persistente),
+        ):
+            self.stdout.write(
+                f'{nome:<18} {tempo * 1000:8.3f} ms/request   {conexoes} conexões abertas'
+            )
+        economia = sem_persistencia[0] - persistente[0]
+        self.stdout.write(f'Custo de conexão removido: {economia * 1000:.3f} ms/request')
+
+    def _medir(self, conexao, conn_max_age, total):
+        conexao.close()
+        conexao.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        abertas = 0
+        inicio = time.perf_counter()
+        for _ in range(total):
+            request_started.send(sender=self.__class__)
+            if conexao.connection is None:
+                abertas += 1
+            Reserva.objects.using(conexao.alias).filter(pk=0).exists()
+            request_finished.send(sender=self.__class__)
+        return (time.perf_counter() - inicio) / total, abertas
@@ -0,0 +1,220 @@
+"""
+Benchmark do snapshot de disponibilidade (app/availability.py) entre processos.
+
+Cria salas e reservas de teste, reconstrói o snapshot e abre N processos
+leitores (como os workers WSGI) que consultam a disponibilidade de salas
+aleatórias. Enquanto isso o processo principal cria e exclui reservas (cada
+commit atualiza o snapshot) e, na metade do tempo, reconstrói o arquivo.
+
+Mostra, por processo: leituras por segundo, latência p50/p99, queries ao
+banco (deve ser 0) e a memória (RssAnon: própria do processo; RssFile: páginas
+do arquivo, compartilhadas). No fim compara o snapshot com o banco e remove
+os dados de teste.
+
+Uso: python manage.py bench_disponibilidade [--processos 4] [--segundos 5] [--salas 300]
+
+"""
+
+import multiprocessing
+import random
+import signal
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+PREFIXO = 'bench_disp_'
+NI_BASE = 1_900_000_000
+
+# Os processos leitores são iniciados com "spawn": como no worker, nada que
+# dependa dos models é importado no topo do módulo.
+
+
+def _iniciar_processo():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import django
+    django.setup()
+
+
+def _memoria():
+    """RssAnon e RssFile do processo em kB (Linux); None em outros sistemas."""
+    try:
+        with open('/proc/self/status') as status:
+            campos = dict(linha.split(':', 1) for linha in status if linha.startswith(('RssAnon', 'RssFile')))
+    except OSError:
+        return None
+    return {nome: int(valor.split()[0]) for nome, valor in campos.items()}
+
+
+def _ler(segundos, ids, codigo):
+    from contextlib import ExitStack
+    from django.db import connections
+    from app.availability import snapshot_do_campus
+
+    snapshot = snapshot_do_campus(codigo)
+    memoria_inicial = _memoria()
+    queries = []
+    latencias = []
+    geracoes = set()
+    hoje = timezone.localdate()
+    with ExitStack() as pilha:
+        for alias in connections:
+            def contar(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+            pilha.enter_context(connections[alias].execute_wrapper(contar))
+        fim = time.monotonic() + segundos
+        while time.monotonic() < fim:
+            dia = hoje + timedelta(days=random.randrange(30))
+            inicio = time.perf_counter()
+            if random.random() < 0.8:
+                geracao, _ = snapshot.ocupacao(random.choice(ids), dia, dia + timedelta(days=6))
+            else:
+                primeira = random.randrange(14, 40)
+                geracao, _ = snapshot.salas_livres(dia, primeira, primeira + 4)
+            latencias.append(time.perf_counter() - inicio)
+            geracoes.add(geracao)
+    return {
+        'leituras': len(latencias),
+        'p50': statistics.median(latencias),
+        'p99': sorted(latencias)[int(len(latencias) * 0.99)],
+        'queries': len(queries),
+        'geracoes': len(geracoes),
+        'memoria_inicial': memoria_inicial,
+        'memoria_final': _memoria(),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Mede leituras do snapshot de disponibilidade em vários processos com escritas concorrentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=4, help='Processos leitores.')
+        parser.add_argument('--segundos', type=float, default=5.0, help='Duração da medição.')
+        parser.add_argument('--salas', type=int, default=300, help='Salas de teste criadas.')
+
+    def handle(self, *args, **options):
+        from app.availability import ocupacao_no_banco, snapshot_do_campus
+        from app.routers import alias_do_campus, campus_atual
+
+        codigo = campus_atual()
+        snapshot = snapshot_do_campus(codigo)
+        salas, disciplina = self._dados(options['salas'])
+        ids = [sala.pk for sala in salas]
+        try:
+            inicio = time.perf_counter()
+            cabecalho = snapshot.reconstruir()
+            self.stdout.write(f'Reconstrução: {cabecalho.salas} salas x {cabecalho.dias} dias '
+                              f'em {time.perf_counter() - inicio:.2f}s ({snapshot.caminho.stat().st_size // 1024} kB)')
+
+            amostra = random.sample(ids, min(len(ids), 50))
+            dia_inicial = timezone.localdate()
+            inicio = time.perf_counter()
+            for pk in amostra:
+                ocupacao_no_banco(alias_do_campus(codigo), [pk], dia_inicial, 7)
+            self.stdout.write(f'Mesma consulta pelo banco: {(time.perf_counter() - inicio) / len(amostra) * 1e6:.0f} µs '
+                              f'por sala (para comparação)')
+
+            contexto = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(options['processos'], mp_context=contexto,
+                                     initializer=_iniciar_processo) as pool:
+                futuros = [pool.submit(_ler, options['segundos'], ids, codigo) for _ in range(options['processos'])]
+                escritas = self._escrever(salas, disciplina, options['segundos'], snapshot)
+                resultados = [futuro.result() for futuro in futuros]
+
+            self.stdout.write(f'{escritas} commits de reservas durante a medição (+1 reconstrução).')
+            for numero, resultado in enumerate(resultados, 1):
+                memoria = ''
+                if resultado['memoria_final']:
+                    antes, depois = resultado['memoria_inicial'], resultado['memoria_final']
+                    memoria = (f'  RssAnon {antes["RssAnon"]}->{depois["RssAnon"]} kB'
+                               f'  RssFile {antes["RssFile"]}->{depois["RssFile"]} kB')
+                self.stdout.write(
+                    f'processo {numero}: {resultado["leituras"] / options["segundos"]:>9.0f} leituras/s'
+                    f'  p50 {resultado["p50"] * 1e6:.1f} µs  p99 {resultado["p99"] * 1e6:.1f} µs'
+                    f'  queries {resultado["queries"]}  gerações vistas {resultado["geracoes"]}{memoria}'
+                )
+            if any(resultado['queries'] for resultado in resultados):
+                raise CommandError('Leituras do snapshot consultaram o banco.')
+            self._conferir(snapshot, codigo)
+        finally:
+            self._limpar()
+            snapshot.reconstruir()
+
+    def _dados(self, quantidade):
+        from app.models import Disciplina, Reserva, Sala, Usuario
+
+        self._limpar()
+        Usuario.objects.bulk_create([
+            Usuario(username=f'{PREFIXO}{i}', email=f'{PREFIXO}{i}@exemplo.com', tipo='PROFESSOR', ni=NI_BASE + i)
+            for i in range(quantidade)
+        ])
+        professores = list(Usuario.objects.filter(username__startswith=PREFIXO).order_by('pk'))
+        disciplina = Disciplina.objects.create(nome=f'{PREFIXO}disciplina', curso='Bench', carga_horaria=10,
+                                               professor=professores[0])
+        Sala.objects.bulk_create([
+            Sala(nome=f'{PREFIXO}{i}', curso='Bench', capacidade=30, periodo='MANHA', professor=professor)
+            for i, professor in enumerate(professores)
+        ])
+        salas = list(Sala.objects.filter(nome__startswith=PREFIXO).order_by('pk'))
+        hoje = timezone.localdate()
+        reservas = []
+        for sala in salas:
+            for dia in range(0, 30, 2):
+                inicio = timezone.make_aware(datetime.combine(hoje + timedelta(days=dia), datetime.min.time())
+                                             + timedelta(hours=random.randrange(7, 20)))
+                reservas.append(Reserva(data_inicio=inicio, data_termino=inicio + timedelta(hours=1), periodo='MANHA',
+                                        sala_reservada=sala, professor=sala.professor, disciplina=disciplina))
+        Reserva.objects.bulk_create(reservas)
+        return salas, disciplina
+
+    def _escrever(self, salas, disciplina, segundos, snapshot):
+        """Cria e exclui reservas (cada uma no seu commit) e reconstrói o arquivo na metade."""
+        from django.core.exceptions import ValidationError
+        from app.models import Reserva
+
+        escritas = 0
+        reconstruido = False
+        inicio_medicao = time.monotonic()
+        while time.monotonic() - inicio_medicao < segundos:
+            if not reconstruido and time.monotonic() - inicio_medicao > segundos / 2:
+                snapshot.reconstruir()
+                reconstruido = True
+            sala = random.choice(salas)
+            inicio = timezone.make_aware(datetime.combine(
+                timezone.localdate() + timedelta(days=random.randrange(1, 30, 2)), datetime.min.time()
+            ) + timedelta(hours=random.randrange(7, 20)))
+            try:
+                reserva = Reserva.objects.create(data_inicio=inicio, data_termino=inicio + timedelta(minutes=50),
+                                                 periodo='TARDE', sala_reservada=sala, professor=sala.professor,
+                                                 disciplina=disciplina)
+            except ValidationError:
+                continue
+            escritas += 1
+            if random.random() < 0.5:
+                reserva.delete()
+                escritas += 1
+            time.sleep(0.005)
+        return escritas
+
+    def _conferir(self, snapshot, codigo):
+        from app.availability import ocupacao_no_banco
+        from app.routers import alias_do_campus
+
+        primeiro, ultimo = snapshot.janela()
+        banco = ocupacao_no_banco(alias_do_campus(codigo), None, primeiro, (ultimo - primeiro).days + 1)
+        divergentes = [pk for pk, linhas in banco.items() if snapshot.ocupacao(pk, primeiro, ultimo)[1] != linhas]
+        if divergentes:
+            raise CommandError(f'Snapshot diverge do banco em {len(divergentes)} sala(s): {divergentes[:10]}')
+        self.stdout.write(self.style.SUCCESS(f'Snapshot igual ao banco nas {len(banco)} salas.'))
+
+    def _limpar(self):
+        from app.models import Disciplina, Reserva, Sala, Usuario
+
+        Reserva.objects.filter(sala_reservada__nome__startswith=PREFIXO).delete()
+        Sala.objects.filter(nome__startswith=PREFIXO).delete()
+        Disciplina.objects.filter(nome__startswith=PREFIXO).delete()
+        Usuario.objects.filter(username__startswith=PREFIXO).delete()
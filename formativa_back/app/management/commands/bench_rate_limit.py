@@ -0,0 +1,68 @@
+"""
+Teste de carga do limite de requisições (app/throttling.py).
+
+Simula um cliente em loop contra reservas/ e auth/ durante alguns segundos,
+com e sem o middleware, e conta as queries que chegaram ao banco e as
+tentativas de senha que passaram do limite.
+
+Uso: python manage.py bench_rate_limit --segundos 5
+
+"""
+
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import Usuario
+
+
+class Command(BaseCommand):
+    help = 'Mostra que a carga no banco fica limitada enquanto um cliente inunda a API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segundos', type=float, default=5.0, help='Duração de cada rodada.')
+
+    def handle(self, *args, **options):
+        gestor, _ = Usuario.objects.get_or_create(
+            username='bench_rate_gestor', defaults={'tipo': 'GESTOR', 'ni': 990000011}
+        )
+        token = AccessToken.for_user(gestor)
+        token['tipo'] = gestor.tipo
+        hosts = settings.ALLOWED_HOSTS + ['testserver']
+        try:
+            for ativo in (False, True):
+                configuracao = dict(settings.RATE_LIMIT, ATIVO=ativo)
+                with override_settings(RATE_LIMIT=configuracao, ALLOWED_HOSTS=hosts):
+                    rotulo = 'com limite' if ativo else 'sem limite'
+                    self._rodada(f'reservas/ {rotulo}', options['segundos'],
+                                 lambda c: c.get('/app/reservas/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+                    self._rodada(f'auth/     {rotulo}', options['segundos'],
+                                 lambda c: c.post('/app/auth/', {'username': gestor.username, 'password': 'errada'}))
+        finally:
+            gestor.delete()
+
+    def _rodada(self, rotulo, segundos, requisicao):
+        cliente = Client()
+        respostas = {}
+        queries = 0
+
+        def contar(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(contar):
+            fim = time.perf_counter() + segundos
+            while time.perf_counter() < fim:
+                status = requisicao(cliente).status_code
+                respostas[status] = respostas.get(status, 0) + 1
+        total = sum(respostas.values())
+        self.stdout.write(
+            f'{rotulo}: {total / segundos:8.0f} req/s   {queries / segundos:8.1f} queries/s   '
+            f'respostas {dict(sorted(respostas.items()))}'
+        )
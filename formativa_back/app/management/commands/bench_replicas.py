@@ -0,0 +1,152 @@
+"""
+Teste local das réplicas de leitura (app/replicas.py) com stand-ins SQLite.
+
+As réplicas SQLite são cópias do arquivo primário abertas em modo somente
+leitura; "replicar" é copiar o primário de novo. Entre uma cópia e outra a
+réplica fica atrasada, o que permite ver a leitura após escrita funcionando:
+
+1. distribui GETs de reservas/ e mostra quantas queries foram a cada banco;
+2. o gestor cria uma reserva e lista em seguida (fixado no primário: aparece);
+3. o professor, que não escreveu, lista pela réplica (ainda não aparece);
+4. depois da janela de fixação o gestor volta a ler da réplica.
+
+Uso:
+    DB_ENGINE=sqlite DB_REPLICAS=/tmp/replica1.sqlite3,/tmp/replica2.sqlite3 \\
+        python manage.py bench_replicas --requests 200
+
+"""
+
+import sqlite3
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import Disciplina, Reserva, Sala, Usuario
+from app.replicas import replicas, saude_replicas
+
+
+class Command(BaseCommand):
+    help = 'Mostra a distribuição das leituras entre as réplicas e a leitura após escrita.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='GETs na rodada de distribuição.')
+        parser.add_argument('--fixacao', type=float, default=1.0,
+                            help='Segundos de fixação no primário usados no teste.')
+
+    def handle(self, *args, **options):
+        if not replicas():
+            raise CommandError('Nenhuma réplica configurada (DB_REPLICAS).')
+        gestor, professor, sala, disciplina = self._dados()
+        configuracao = dict(settings.REPLICAS, FIXAR_APOS_ESCRITA=options['fixacao'])
+        hosts = settings.ALLOWED_HOSTS + ['testserver']
+        limite = dict(settings.RATE_LIMIT, ATIVO=False)
+        try:
+            self._replicar()
+            with override_settings(REPLICAS=configuracao, ALLOWED_HOSTS=hosts, RATE_LIMIT=limite):
+                self._distribuicao(professor, options['requests'])
+                self._leitura_apos_escrita(gestor, professor, sala, disciplina, options['fixacao'])
+        finally:
+            Reserva.objects.using('default').filter(sala_reservada=sala).delete()
+            sala.delete(using='default')
+            disciplina.delete(using='default')
+            Usuario.objects.using('default').filter(pk__in=[gestor.pk, professor.pk]).delete()
+            self._replicar()
+
+    def _dados(self):
+        gestor, _ = Usuario.objects.using('default').get_or_create(
+            username='bench_replica_gestor', defaults={'tipo': 'GESTOR', 'ni': 990000021}
+        )
+        professor, _ = Usuario.objects.using('default').get_or_create(
+            username='bench_replica_professor', defaults={'tipo': 'PROFESSOR', 'ni': 990000022}
+        )
+        sala = Sala.objects.using('default').create(
+            nome='Bench réplica', curso='Bench', capacidade=10, periodo='MANHA', professor=professor
+        )
+        disciplina = Disciplina.objects.using('default').create(
+            nome='Bench réplica', curso='Bench', carga_horaria=10, professor=professor
+        )
+        return gestor, professor, sala, disciplina
+
+    def _replicar(self):
+        """Copia cada primário SQLite para as suas réplicas (a "replicação" do stand-in)."""
+        for primario, aliases in replicas().items():
+            origem = connections[primario]
+            if origem.vendor != 'sqlite':
+                continue
+            origem.ensure_connection()
+            for alias in aliases:
+                connections[alias].close()
+                arquivo = connections[alias].settings_dict['NAME'].removeprefix('file:').split('?')[0]
+                with sqlite3.connect(arquivo) as destino:
+                    origem.connection.backup(destino)
+        saude_replicas.esquecer()
+
+    def _cliente(self, usuario):
+        token = AccessToken.for_user(usuario)
+        token['tipo'] = usuario.tipo
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def _contando(self):
+        """Conta as queries por alias enquanto o bloco roda."""
+        por_banco = Counter()
+        pilha = ExitStack()
+        for alias in connections:
+            def contar(execute, sql, params, many, context, alias=alias):
+                por_banco[alias] += 1
+                return execute(sql, params, many, context)
+            pilha.enter_context(connections[alias].execute_wrapper(contar))
+        return pilha, por_banco
+
+    def _listar(self, cliente):
+        pilha, por_banco = self._contando()
+        with pilha:
+            ids = {r['id'] for r in cliente.get('/app/reservas/').json()}
+        return ids, sorted(por_banco)
+
+    def _distribuicao(self, professor, total):
+        cliente = self._cliente(professor)
+        pilha, por_banco = self._contando()
+        inicio = time.perf_counter()
+        with pilha:
+            for _ in range(total):
+                cliente.get('/app/reservas/')
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'{total} GETs em {duracao:.2f}s; queries por banco:')
+        for alias, quantidade in sorted(por_banco.items()):
+            self.stdout.write(f'  {alias:<24} {quantidade}')
+
+    def _leitura_apos_escrita(self, gestor, professor, sala, disciplina, fixacao):
+        cliente_gestor, cliente_professor = self._cliente(gestor), self._cliente(professor)
+        inicio = timezone.now() + timedelta(days=1)
+        resposta = cliente_gestor.post('/app/reservas/', {
+            'data_inicio': inicio.isoformat(),
+            'data_termino': (inicio + timedelta(hours=1)).isoformat(),
+            'periodo': 'MANHA',
+            'sala_reservada': sala.pk,
+            'professor': professor.pk,
+            'disciplina': disciplina.pk,
+        })
+        if resposta.status_code != 201:
+            raise CommandError(f'Falha ao criar a reserva: {resposta.status_code} {resposta.content[:200]}')
+        reserva_id = resposta.json()['id']
+
+        def relatar(rotulo, cliente):
+            ids, bancos = self._listar(cliente)
+            visivel = 'visível' if reserva_id in ids else 'ausente'
+            self.stdout.write(f'{rotulo:<42} reserva {visivel:<8} bancos {", ".join(bancos)}')
+
+        relatar('Gestor logo após criar', cliente_gestor)
+        relatar('Professor (não escreveu)', cliente_professor)
+        time.sleep(fixacao + 0.1)
+        relatar('Gestor após a janela de fixação', cliente_gestor)
+        self._replicar()
+        relatar('Professor após a replicação', cliente_professor)
@@ -0,0 +1,158 @@
+"""
+Teste de carga local do stream SSE de reservas.
+
+Abre N conexões diretamente na aplicação ASGI (sem servidor HTTP), mede a
+memória ocupada por conexão ociosa e a latência de entrega dos eventos
+publicados no hub. O rate limit fica desligado durante a medição; uma conexão
+recusada (ex.: 401, 429) interrompe o teste com erro.
+
+Uso: python manage.py bench_sse --conexoes 2000 --eventos 50
+
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.events import hub_reservas
+from app.models import Usuario
+from app.routers import campus_padrao
+
+
+class Command(BaseCommand):
+    help = 'Mede conexões SSE por processo e a latência de entrega de eventos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conexoes', type=int, default=1000, help='Conexões simultâneas.')
+        parser.add_argument('--eventos', type=int, default=50, help='Eventos publicados.')
+        parser.add_argument('--intervalo', type=float, default=0.01, help='Segundos entre eventos.')
+
+    def handle(self, *args, **options):
+        gestor, professor = self._usuarios()
+        try:
+            # Cada conexão é um request do mesmo usuário: com o limite ligado o
+            # balde esvazia nas primeiras dezenas e o restante recebe 429.
+            with override_settings(RATE_LIMIT=dict(settings.RATE_LIMIT, ATIVO=False)):
+                asyncio.run(self._executar(gestor, professor, options))
+        finally:
+            Usuario.objects.filter(pk__in=[gestor.pk, professor.pk]).delete()
+
+    def _usuarios(self):
+        gestor, _ = Usuario.objects.get_or_create(
+            username='bench_sse_gestor', defaults={'tipo': 'GESTOR', 'ni': 990000001}
+        )
+        professor, _ = Usuario.objects.get_or_create(
+            username='bench_sse_professor', defaults={'tipo': 'PROFESSOR', 'ni': 990000002}
+        )
+        return gestor, professor
+
+    async def _executar(self, gestor, professor, options):
+        application = get_asgi_application()
+        total = options['conexoes']
+        tokens = [str(AccessToken.for_user(u)).encode() for u in (gestor, professor)]
+        desconectar = asyncio.Event()
+        prontas = asyncio.Semaphore(0)
+        recebidos = {}  # id do evento -> lista de instantes de recebimento
+        recusadas = []  # status das conexões que não abriram o stream
+
+        async def conexao(indice):
+            token = tokens[indice % 2]
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': '/app/reservas/stream/',
+                'raw_path': b'/app/reservas/stream/', 'root_path': '', 'query_string': b'',
+                'headers': [(b'host', b'localhost'), (b'authorization', b'Bearer ' + token)],
+                'client': ('127.0.0.1', 10000 + indice), 'server': ('localhost', 8000),
+            }
+            corpo_lido = False
+            iniciada = False
+
+            async def receive():
+                nonlocal corpo_lido
+                if not corpo_lido:
+                    corpo_lido = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await desconectar.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(mensagem):
+                nonlocal iniciada
+                if mensagem['type'] == 'http.response.start':
+                    iniciada = True
+                    if mensagem['status'] != 200:
+                        recusadas.append(mensagem['status'])
+                    prontas.release()
+                    return
+                agora = time.perf_counter()
+                for linha in mensagem.get('body', b'').split(b'\n'):
+                    if linha.startswith(b'id: '):
+                        recebidos.setdefault(int(linha[4:]), []).append(agora)
+
+            try:
+                await application(scope, receive, send)
+            finally:
+                if not iniciada:
+                    recusadas.append('sem resposta')
+                    prontas.release()
+
+        tracemalloc.start()
+        antes = tracemalloc.take_snapshot()
+        inicio = time.perf_counter()
+        tarefas = [asyncio.create_task(conexao(i)) for i in range(total)]
+        for _ in range(total):
+            await prontas.acquire()
+        abertura = time.perf_counter() - inicio
+        if recusadas:
+            desconectar.set()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            tracemalloc.stop()
+            raise CommandError(f'{len(recusadas)} de {total} conexões recusadas '
+                               f'(status: {", ".join(map(str, sorted(set(recusadas), key=str)))}).')
+        # Dá tempo para todas as conexões chegarem à espera ociosa.
+        while len(hub_reservas) < total:
+            await asyncio.sleep(0.01)
+        depois = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        bytes_conexao = sum(s.size_diff for s in depois.compare_to(antes, 'filename')) / total
+
+        publicados = {}
+
+        def publicar():
+            for i in range(options['eventos']):
+                evento = hub_reservas.publicar(
+                    'reserva_criada', {'id': i}, professor.pk if i % 2 else gestor.pk, campus_padrao()
+                )
+                publicados[evento['id']] = (evento['publicado_em'], evento['professor'])
+                time.sleep(options['intervalo'])
+
+        await asyncio.to_thread(publicar)
+        await asyncio.sleep(0.2)
+
+        latencias = []
+        entregas_esperadas = 0
+        gestores = (total + 1) // 2
+        for evento_id, (publicado_em, dono) in publicados.items():
+            # Gestores recebem tudo; professores apenas os próprios eventos.
+            entregas_esperadas += gestores + (total - gestores if dono == professor.pk else 0)
+            latencias.extend(t - publicado_em for t in recebidos.get(evento_id, []))
+
+        desconectar.set()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+        latencias.sort()
+        self.stdout.write(f'Conexões abertas:        {total} em {abertura:.2f}s')
+        self.stdout.write(f'Memória por conexão:     {bytes_conexao / 1024:.1f} KiB')
+        self.stdout.write(f'Threads no processo:     {threading.active_count()}')
+        self.stdout.write(f'Entregas:                {len(latencias)}/{entregas_esperadas}')
+        if latencias:
+            p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+            self.stdout.write(f'Latência mediana:        {statistics.median(latencias) * 1000:.2f} ms')
+            self.stdout.write(f'Latência p99:            {p99 * 1000:.2f} ms')
@@ -0,0 +1,43 @@
+"""
+Aplica as migrations no banco default e no banco de cada campus.
+
+O `migrate` do Django só migra um banco por vez; com DB_CAMPI configurado
+este comando percorre o default e todos os aliases de settings.CAMPI.
+
+As migrations iniciais criam as chaves estrangeiras de salas, disciplinas e
+reservas para app_usuario, que só existe no default (a 0005 remove essas
+constraints). Nos bancos de campus o migrate roda com a verificação de chaves
+estrangeiras desligada, o que permite ao MySQL criar a constraint para a tabela
+ausente até a 0005 removê-la. Rodar `migrate --database=<campus>` direto falha
+no MySQL com o erro 1824.
+
+Uso: python manage.py migrar_campi
+
+"""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app.routers import campi
+
+
+class Command(BaseCommand):
+    help = 'Roda o migrate no banco default e no banco de cada campus.'
+
+    def handle(self, *args, **options):
+        for alias in [DEFAULT_DB_ALIAS, *campi().values()]:
+            self.stdout.write(f'Migrando {alias}...')
+            if alias == DEFAULT_DB_ALIAS:
+                call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+                continue
+            conexao = connections[alias]
+            if not conexao.disable_constraint_checking():
+                raise CommandError(
+                    f'{conexao.vendor} não permite desligar a verificação de chaves estrangeiras; '
+                    'o banco de campus não pode ser criado a partir das migrations iniciais.'
+                )
+            try:
+                call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+            finally:
+                conexao.enable_constraint_checking()
@@ -0,0 +1,34 @@
+"""
+Reconstrói o snapshot de disponibilidade das salas (app/availability.py).
+
+Os workers reconstroem o arquivo sozinhos quando ele não existe ou a janela
+vence; rodar este comando no deploy (e, se quiser, num cron diário) evita que
+o primeiro request do dia pague a reconstrução.
+
+Uso: python manage.py montar_disponibilidade [--campus sp]
+
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.availability import snapshot_do_campus
+from app.routers import campi
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o snapshot de disponibilidade das salas de cada campus.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campus', action='append', help='Campus a reconstruir (padrão: todos).')
+
+    def handle(self, *args, **options):
+        for codigo in options['campus'] or campi() or [None]:
+            snapshot = snapshot_do_campus(codigo)
+            inicio = time.perf_counter()
+            cabecalho = snapshot.reconstruir()
+            self.stdout.write(
+                f'{snapshot.caminho}: {cabecalho.salas} salas x {cabecalho.dias} dias, '
+                f'geração {cabecalho.geracao}, {time.perf_counter() - inicio:.2f}s'
+            )
@@ -0,0 +1,249 @@
+"""
+Orçamento de queries por rota da API.
+
+Carrega dados de teste em dois tamanhos e chama cada rota de app/urls.py com
+um token de Gestor e um de Professor, contando as queries. Falha quando:
+
+- a contagem cresce com o número de linhas (N+1), mostrando o SQL repetido;
+- a contagem passa do valor gravado em app/orcamento_queries.json;
+- a rota responde com erro do servidor (5xx) ou com um status diferente do
+  gravado junto da contagem;
+- uma rota nova não tem requisição definida em ROTAS.
+
+Tudo roda dentro de uma transação em cada banco (default, campi e réplicas),
+desfeita no final: nenhum banco é alterado.
+
+Uso:
+    python manage.py orcamento_queries              # verifica
+    python manage.py orcamento_queries --atualizar  # grava as contagens atuais
+
+"""
+
+import json
+import tempfile
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import Disciplina, ExclusaoEmLote, Reserva, ReservaRecorrente, Sala, Tarefa, Usuario
+from app.urls import urlpatterns
+
+ARQUIVO_BASE = Path(__file__).resolve().parents[2] / 'orcamento_queries.json'
+PREFIXO = 'orcamento_'
+NI_BASE = 2_000_000_000
+SENHA = 'Orcamento@123'
+
+# Rota -> (método, {parâmetro da URL: objeto dos dados de teste}, query string ou corpo).
+# None marca as rotas fora da verificação, com o motivo.
+ROTAS = {
+    'salas/': ('GET', {}, None),
+    'salas/<int:pk>': ('GET', {'pk': 'sala'}, None),
+    'salas/professores/<int:ni>/': ('GET', {'ni': 'professor'}, None),
+    'salas/livres/': ('GET', {}, {'data': '2030-01-07', 'inicio': '08:00', 'fim': '10:00'}),
+    'salas/<int:pk>/disponibilidade/': ('GET', {'pk': 'sala'}, {'inicio': '2030-01-07', 'fim': '2030-01-13'}),
+    'usuarios/': ('GET', {}, None),
+    'usuarios/lote/': ('POST', {}, []),
+    'usuarios/professores/': ('GET', {}, None),
+    'usuarios/<int:pk>/': ('GET', {'pk': 'professor'}, None),
+    'disciplinas/': ('GET', {}, None),
+    'disciplinas/<int:pk>/': ('GET', {'pk': 'disciplina'}, None),
+    'disciplinas/professores/<int:ni>/': ('GET', {'ni': 'professor'}, None),
+    'reservas/': ('GET', {}, None),
+    'reservas/<int:pk>/': ('GET', {'pk': 'reserva'}, None),
+    'reservas/professores/<int:ni>/': ('GET', {'ni': 'professor'}, None),
+    'reservas/stream/': None,  # SSE: conexão assíncrona sem fim; medida por bench_sse
+    'reservas/calendario/': ('GET', {}, {'inicio': '2030-01-01', 'fim': '2030-01-31'}),
+    'reservas/recorrentes/': ('GET', {}, None),
+    'reservas/recorrentes/<int:pk>/': ('GET', {'pk': 'recorrente'}, None),
+    'reservas/recorrentes/<int:pk>/ocorrencias/': ('GET', {'pk': 'recorrente'},
+                                                   {'inicio': '2030-01-01', 'fim': '2030-01-31'}),
+    'auth/': ('POST', {}, 'credenciais'),
+    'exclusoes/<int:pk>/': ('GET', {'pk': 'exclusao'}, None),
+    'tarefas/': ('GET', {}, None),
+    'tarefas/<int:pk>/': ('GET', {'pk': 'tarefa'}, None),
+    'busca/': ('GET', {}, {'q': PREFIXO}),
+    'periodos/': ('GET', {}, None),
+}
+
+
+@contextmanager
+def _desfeito():
+    """Abre uma transação em cada banco configurado e desfaz todas na saída."""
+    with ExitStack() as pilha:
+        for alias in connections:
+            pilha.enter_context(transaction.atomic(using=alias))
+        yield
+        for alias in connections:
+            transaction.set_rollback(True, using=alias)
+
+
+class Command(BaseCommand):
+    help = 'Verifica o número de queries de cada rota contra o orçamento gravado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pequeno', type=int, default=3, help='Linhas por tabela no tamanho pequeno.')
+        parser.add_argument('--grande', type=int, default=15, help='Linhas por tabela no tamanho grande.')
+        parser.add_argument('--atualizar', action='store_true',
+                            help='Grava as contagens atuais como novo orçamento.')
+
+    def handle(self, *args, **options):
+        rotas = [str(p.pattern) for p in urlpatterns]
+        sem_definicao = [rota for rota in rotas if rota not in ROTAS]
+        if sem_definicao:
+            raise CommandError(f'Rotas sem requisição definida em ROTAS: {", ".join(sem_definicao)}')
+
+        hosts = settings.ALLOWED_HOSTS + ['testserver']
+        limite = dict(settings.RATE_LIMIT, ATIVO=False)
+        tarefas = dict(getattr(settings, 'TAREFAS', {}), NO_PROCESSO=False)
+        with tempfile.TemporaryDirectory() as pasta:
+            # Snapshot de disponibilidade à parte: os dados de teste são desfeitos no fim.
+            disponibilidade = dict(getattr(settings, 'DISPONIBILIDADE', {}), ARQUIVO=Path(pasta) / 'disponibilidade.bin',
+                                   DIAS_PASSADOS=(timezone.localdate() - date(2030, 1, 1)).days)
+            with override_settings(ALLOWED_HOSTS=hosts, RATE_LIMIT=limite, TAREFAS=tarefas,
+                                   DISPONIBILIDADE=disponibilidade):
+                pequeno = self._medir(rotas, options['pequeno'])
+                grande = self._medir(rotas, options['grande'])
+
+        base = json.loads(ARQUIVO_BASE.read_text()) if ARQUIVO_BASE.exists() else {}
+        falhas = []
+        for chave, (status, contagem, sql) in sorted(grande.items()):
+            contagem_pequena, sql_pequeno = pequeno[chave][1], pequeno[chave][2]
+            orcamento = base.get(chave, {}).get('queries')
+            status_esperado = base.get(chave, {}).get('status')
+            self.stdout.write(
+                f'{chave:<58} {status}  {contagem_pequena:>3} -> {contagem:>3} queries'
+                f'  (orçamento {orcamento if orcamento is not None else "-"})'
+            )
+            if status >= 500 or pequeno[chave][0] >= 500:
+                falhas.append(f'{chave}: erro do servidor ({pequeno[chave][0]} -> {status})')
+            elif not options['atualizar'] and status_esperado is not None and status != status_esperado:
+                falhas.append(f'{chave}: status {status}, esperado {status_esperado}')
+            if contagem > contagem_pequena:
+                repetidas = [
+                    f'    {vezes - sql_pequeno[texto]:+d}x {texto}'
+                    for texto, vezes in sql.most_common() if vezes > sql_pequeno[texto]
+                ]
+                falhas.append(f'{chave}: cresce com o número de linhas '
+                              f'({contagem_pequena} -> {contagem})\n' + '\n'.join(repetidas))
+            elif not options['atualizar'] and orcamento is not None and contagem > orcamento:
+                falhas.append(f'{chave}: {contagem} queries, orçamento {orcamento}\n'
+                              + '\n'.join(f'    {vezes}x {texto}' for texto, vezes in sql.most_common()))
+
+        if falhas:
+            raise CommandError('Orçamento de queries estourado:\n' + '\n'.join(falhas))
+        if options['atualizar']:
+            atual = {chave: {'status': status, 'queries': contagem}
+                     for chave, (status, contagem, _) in sorted(grande.items())}
+            ARQUIVO_BASE.write_text(json.dumps(atual, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Orçamento gravado em {ARQUIVO_BASE.name}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Todas as rotas dentro do orçamento.'))
+
+    def _medir(self, rotas, tamanho):
+        """Mede todas as rotas com `tamanho` linhas por tabela; nada é gravado."""
+        resultados = {}
+        with _desfeito():
+            dados = self._carregar(tamanho)
+            for papel in ('GESTOR', 'PROFESSOR'):
+                usuario = dados['gestor'] if papel == 'GESTOR' else dados['professor']
+                token = AccessToken.for_user(usuario)
+                token['tipo'] = usuario.tipo
+                cliente = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {token}')
+                for rota in rotas:
+                    if ROTAS[rota] is None:
+                        continue
+                    metodo, parametros, extra = ROTAS[rota]
+                    url = '/app/' + rota
+                    for nome, objeto in parametros.items():
+                        valor = dados[objeto].ni if nome == 'ni' else dados[objeto].pk
+                        url = url.replace(f'<int:{nome}>', str(valor))
+                    if extra == 'credenciais':
+                        extra = {'username': usuario.username, 'password': SENHA}
+
+                    def chamar():
+                        if metodo == 'GET':
+                            return cliente.get(url, extra)
+                        return cliente.post(url, extra, content_type='application/json')
+
+                    # A primeira chamada aquece caches (ex.: índice de busca); mede-se a segunda.
+                    with _desfeito():
+                        chamar()
+                    with _desfeito():
+                        status, sql = self._contar(chamar)
+                    resultados[f'{metodo} {rota} [{papel}]'] = (status, sum(sql.values()), sql)
+        return resultados
+
+    def _contar(self, chamar):
+        sql = Counter()
+        with ExitStack() as pilha:
+            for alias in connections:
+                def contar(execute, texto, params, many, context):
+                    sql[texto] += 1
+                    return execute(texto, params, many, context)
+                pilha.enter_context(connections[alias].execute_wrapper(contar))
+            status = chamar().status_code
+        return status, sql
+
+    def _carregar(self, tamanho):
+        """Cria `tamanho` linhas de cada tabela, a maior parte ligada ao professor testado."""
+        gestor = Usuario.objects.create_user(
+            username=f'{PREFIXO}gestor', email=f'{PREFIXO}gestor@exemplo.com', password=SENHA, tipo='GESTOR', ni=NI_BASE,
+        )
+        professor = Usuario.objects.create_user(
+            username=f'{PREFIXO}professor', email=f'{PREFIXO}professor@exemplo.com', password=SENHA, tipo='PROFESSOR', ni=NI_BASE + 1,
+        )
+        Usuario.objects.bulk_create([
+            Usuario(username=f'{PREFIXO}p{i}', tipo='PROFESSOR', ni=NI_BASE + 10 + i) for i in range(tamanho)
+        ])
+        sala = Sala.objects.create(nome=f'{PREFIXO}sala', curso='Orçamento', capacidade=30,
+                                   periodo='MANHA', professor=professor)
+        disciplina = Disciplina.objects.create(nome=f'{PREFIXO}disciplina', curso='Orçamento',
+                                               carga_horaria=40, professor=professor)
+        outros = list(Usuario.objects.filter(username__startswith=f'{PREFIXO}p').order_by('pk'))
+        Sala.objects.bulk_create([
+            Sala(nome=f'{PREFIXO}sala{i}', curso='Orçamento', capacidade=30, periodo='MANHA', professor=outro)
+            for i, outro in enumerate(outros)
+        ])
+        Disciplina.objects.bulk_create([
+            Disciplina(nome=f'{PREFIXO}disciplina{i}', curso='Orçamento', carga_horaria=40, professor=outro)
+            for i, outro in enumerate(outros)
+        ])
+
+        inicio = timezone.make_aware(datetime.combine(date(2030, 1, 7), time(8)))
+        Reserva.objects.bulk_create([
+            Reserva(data_inicio=inicio + timedelta(days=i), data_termino=inicio + timedelta(days=i, hours=1),
+                    periodo='MANHA', sala_reservada=sala, professor=professor, disciplina=disciplina)
+            for i in range(tamanho)
+        ])
+        ReservaRecorrente.objects.bulk_create([
+            ReservaRecorrente(sala_reservada=sala, professor=professor, disciplina=disciplina, periodo='TARDE',
+                              dias_semana=1 << (i % 5), hora_inicio=time(13 + i % 5), hora_termino=time(14 + i % 5),
+                              data_inicio=date(2030, 1, 1), data_fim=date(2030, 6, 30))
+            for i in range(tamanho)
+        ])
+        ExclusaoEmLote.objects.bulk_create([
+            ExclusaoEmLote(modelo='sala', objeto_id=i, descricao=f'{PREFIXO}{i}', solicitado_por=gestor)
+            for i in range(tamanho)
+        ])
+        Tarefa.objects.bulk_create([
+            Tarefa(nome='criar_usuarios', solicitado_por=professor, status='CONCLUIDA') for _ in range(tamanho)
+        ])
+        return {
+            'gestor': gestor,
+            'professor': professor,
+            'sala': sala,
+            'disciplina': disciplina,
+            'reserva': Reserva.objects.filter(professor=professor).first(),
+            'recorrente': ReservaRecorrente.objects.filter(professor=professor).first(),
+            'exclusao': ExclusaoEmLote.objects.filter(descricao__startswith=PREFIXO).first(),
+            'tarefa': Tarefa.objects.filter(solicitado_por=professor).first(),
+        }
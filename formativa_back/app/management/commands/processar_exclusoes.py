@@ -0,0 +1,42 @@
+"""
+Retoma exclusões em lote pendentes, interrompidas ou com erro.
+
+A exclusão normalmente roda pela fila de tarefas (manage.py worker) logo
+após o DELETE. Se as tentativas da tarefa se esgotarem ou o processo cair no
+meio, este comando continua de onde parou.
+
+Uso: python manage.py processar_exclusoes [--lote 500] [--parada-ha 10]
+
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.deletion import processar_exclusao
+from app.models import ExclusaoEmLote
+
+
+class Command(BaseCommand):
+    help = 'Processa as exclusões em lote pendentes ou interrompidas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help='Linhas por transação.')
+        parser.add_argument('--parada-ha', type=int, default=getattr(settings, 'EXCLUSAO_PARADA_HA', 10),
+                            help='Minutos sem progresso para considerar uma execução interrompida.')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(minutes=options['parada_ha'])
+        ExclusaoEmLote.objects.filter(status='EXECUTANDO', atualizado_em__lt=limite).update(status='PENDENTE')
+
+        pendentes = ExclusaoEmLote.objects.filter(status__in=('PENDENTE', 'ERRO')).order_by('criado_em')
+        for exclusao_id in pendentes.values_list('pk', flat=True):
+            exclusao = processar_exclusao(exclusao_id, tamanho_lote=options['lote'], parada_ha=options['parada_ha'])
+            if exclusao is None:
+                continue
+            self.stdout.write(
+                f'{exclusao.descricao}: {exclusao.get_status_display()} '
+                f'({exclusao.removidos}/{exclusao.total_estimado} linhas)'
+            )
@@ -0,0 +1,172 @@
+"""
+Tempo de inicialização de um worker: importações e primeiros requests.
+
+Sobe duas vezes um processo novo cuja primeira importação é system/wsgi.py
+(o mesmo caminho do gunicorn, sem passar pelo manage.py, que já carregaria o
+Django e rodaria as checagens), uma com DJANGO_AQUECER=0 e outra com
+DJANGO_AQUECER=1 (app/warmup.py), e chama algumas rotas pelo `application` WSGI
+duas vezes seguidas. Mostra:
+
+- o tempo de importação por pacote e por módulo do app (python -X importtime);
+- o tempo até o processo estar pronto para aceitar requests;
+- a latência do primeiro e do segundo request de cada rota, com e sem
+  aquecimento.
+
+Com --maximo, falha se o primeiro request mais lento (aquecido) passar do
+limite em milissegundos, para acompanhar a partida a frio junto dos outros
+benchmarks.
+
+Uso: python manage.py tempo_inicializacao [--modulos 15] [--maximo 200]
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import Usuario
+
+VARIAVEL_TOKEN = 'TEMPO_INICIALIZACAO_TOKEN'
+MARCA_FILHO = 'tempo_inicializacao: carregando o medidor'
+
+# Processo medido: importa o WSGI antes de qualquer outra coisa. A importação
+# deste módulo, feita depois de pronto, fica fora da tabela de importações.
+CODIGO_FILHO = (
+    'import sys, time\n'
+    'import system.wsgi\n'
+    'pronto_em = time.time()\n'
+    f'print({MARCA_FILHO!r}, file=sys.stderr, flush=True)\n'
+    'from app.management.commands.tempo_inicializacao import filho\n'
+    'filho(pronto_em)\n'
+)
+
+
+def _rotas():
+    hoje = timezone.localdate()
+    return [
+        ('salas/', ''),
+        ('reservas/', ''),
+        ('reservas/calendario/', f'inicio={hoje}&fim={hoje + timedelta(days=7)}'),
+        ('salas/livres/', f'data={hoje}&inicio=08:00&fim=10:00'),
+        ('busca/', 'q=a'),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Mede importações e primeiros requests de um worker novo, com e sem aquecimento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modulos', type=int, default=15, help='Pacotes/módulos mais lentos mostrados.')
+        parser.add_argument('--maximo', type=float, default=None,
+                            help='Falha se o primeiro request aquecido mais lento passar deste valor (ms).')
+
+    def handle(self, *args, **options):
+        gestor = Usuario.objects.filter(tipo='GESTOR', is_active=True).first()
+        if gestor is None:
+            raise CommandError('É preciso um usuário Gestor ativo para autenticar os requests.')
+        token = AccessToken.for_user(gestor)
+        token['tipo'] = gestor.tipo
+
+        frio, importacoes = self._medir(str(token), aquecer=False)
+        aquecido, _ = self._medir(str(token), aquecer=True)
+
+        self.stdout.write(f'Importações (processo sem aquecimento, {sum(importacoes.values()) / 1000:.0f} ms no total):')
+        ordenadas = sorted(importacoes.items(), key=lambda item: -item[1])
+        for nome, micros in [item for item in ordenadas if '.' not in item[0]][:options['modulos']]:
+            self.stdout.write(f'  {nome:<40} {micros / 1000:>8.1f} ms')
+        self.stdout.write('Módulos do projeto:')
+        for nome, micros in [item for item in ordenadas if '.' in item[0]][:options['modulos']]:
+            self.stdout.write(f'  {nome:<40} {micros / 1000:>8.1f} ms')
+
+        self.stdout.write('')
+        self.stdout.write(f'{"":<34}{"sem aquecimento":>22}{"com aquecimento":>22}')
+        self.stdout.write(f'{"pronto para requests":<34}{frio["pronto"] * 1000:>19.0f} ms'
+                          f'{aquecido["pronto"] * 1000:>19.0f} ms')
+        for etapa, segundos in aquecido['etapas'].items():
+            self.stdout.write(f'{"  aquecer: " + etapa:<34}{"":>22}{segundos * 1000:>19.1f} ms')
+        for (rota, primeiro, segundo, status), (_, primeiro_quente, segundo_quente, _) in zip(
+            frio['requests'], aquecido['requests']
+        ):
+            self.stdout.write(f'{rota + f" [{status}]":<34}'
+                              f'{primeiro:>11.1f} / {segundo:>5.1f} ms'
+                              f'{primeiro_quente:>11.1f} / {segundo_quente:>5.1f} ms')
+        self.stdout.write('(primeiro / segundo request de cada rota no mesmo processo)')
+
+        pior = max(primeiro for _, primeiro, _, _ in aquecido['requests'])
+        if options['maximo'] is not None and pior > options['maximo']:
+            raise CommandError(f'Primeiro request aquecido levou {pior:.1f} ms (máximo {options["maximo"]} ms).')
+
+    def _medir(self, token, aquecer):
+        """Sobe o processo filho e devolve (resultado, {pacote: microssegundos de importação})."""
+        ambiente = dict(
+            os.environ,
+            DJANGO_AQUECER='1' if aquecer else '0',
+            DJANGO_ALLOWED_HOSTS=','.join([*settings.ALLOWED_HOSTS, 'testserver']),
+            RATE_LIMIT_ATIVO='0',
+            **{VARIAVEL_TOKEN: token},
+        )
+        inicio = time.time()
+        processo = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CODIGO_FILHO],
+            cwd=settings.BASE_DIR, env=ambiente, capture_output=True, text=True,
+        )
+        if processo.returncode:
+            raise CommandError(f'O processo medido falhou:\n{processo.stderr[-2000:]}')
+        resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+        resultado['pronto'] = resultado['pronto_em'] - inicio
+        return resultado, self._importacoes(processo.stderr)
+
+    def _importacoes(self, saida):
+        """Soma o tempo próprio de importação por pacote; módulos do projeto ficam separados."""
+        por_pacote = defaultdict(int)
+        linhas = saida.splitlines()
+        if MARCA_FILHO in linhas:
+            # Descarta a importação do próprio medidor (entre a marca e o primeiro request).
+            marca = linhas.index(MARCA_FILHO)
+            fim_medidor = next((i for i, linha in enumerate(linhas[marca:], marca)
+                                if 'app.management.commands.tempo_inicializacao' in linha), marca)
+            linhas = linhas[:marca] + linhas[fim_medidor + 1:]
+        for linha in linhas:
+            if not linha.startswith('import time:') or 'self [us]' in linha:
+                continue
+            proprio, _, modulo = linha.removeprefix('import time:').split('|')
+            modulo = modulo.strip()
+            chave = modulo if modulo.startswith(('app.', 'system.')) else modulo.split('.')[0]
+            por_pacote[chave] += int(proprio)
+        return por_pacote
+
+
+def filho(pronto_em):
+    """Processo medido: chama as rotas pelo `application` já importado e imprime o resultado em JSON."""
+    from system.wsgi import application
+    from app.warmup import ultimo_aquecimento
+
+    etapas = dict(ultimo_aquecimento)
+    requests = []
+    for rota, consulta in _rotas():
+        tempos = []
+        for _ in range(2):
+            ambiente = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': f'/app/{rota}', 'QUERY_STRING': consulta,
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'HTTP_HOST': 'testserver',
+                'HTTP_AUTHORIZATION': f'Bearer {os.environ[VARIAVEL_TOKEN]}',
+                'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+            }
+            status = []
+            inicio = time.perf_counter()
+            resposta = application(ambiente, lambda s, cabecalhos, exc_info=None: status.append(s))
+            b''.join(resposta)
+            resposta.close()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        requests.append((rota, tempos[0], tempos[1], status[0].split()[0]))
+    print(json.dumps({'pronto_em': pronto_em, 'etapas': etapas, 'requests': requests}))
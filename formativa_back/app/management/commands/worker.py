@@ -0,0 +1,129 @@
+"""
+Worker da fila de tarefas no banco (app/jobs.py).
+
+O processo principal consulta a fila, assume as tarefas prontas (maior
+prioridade primeiro) e as envia a um pool de processos; cada processo do pool
+executa uma tarefa por vez e grava o resultado. Não há broker: vários
+workers, em máquinas diferentes, podem consumir a mesma fila.
+
+SIGINT/SIGTERM param de assumir tarefas novas e esperam as em execução.
+
+Uso: python manage.py worker [--processos 4] [--uma-vez]
+
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+# Os processos do pool são iniciados com "spawn" e importam este módulo antes
+# do django.setup(): nada que dependa dos models pode ser importado no topo.
+
+
+def _iniciar_processo():
+    # Ctrl+C é tratado só pelo processo principal, que espera as tarefas terminarem.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import django
+    django.setup()
+
+
+def _executar(pk):
+    from app.jobs import executar_no_processo
+    return executar_no_processo(pk)
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas da fila do banco num pool de processos.'
+
+    def add_arguments(self, parser):
+        configuracao = getattr(settings, 'TAREFAS', {})
+        parser.add_argument('--processos', type=int, default=configuracao.get('PROCESSOS', 2),
+                            help='Tarefas executadas em paralelo.')
+        parser.add_argument('--intervalo', type=float, default=configuracao.get('INTERVALO', 1.0),
+                            help='Segundos entre consultas à fila quando não há tarefas.')
+        parser.add_argument('--parada-ha', type=int, default=10,
+                            help='Minutos sem sinal de vida para devolver uma tarefa à fila.')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Sai quando a fila estiver vazia (útil em cron e testes).')
+
+    def handle(self, *args, **options):
+        from app import jobs
+
+        self.parar = False
+        signal.signal(signal.SIGINT, self._sinal)
+        signal.signal(signal.SIGTERM, self._sinal)
+        self.trabalhador = f'{socket.gethostname()}:{os.getpid()}'
+        self.processos = options['processos']
+        self.stdout.write(f'Worker {self.trabalhador} com {self.processos} processos.')
+
+        pool = self._pool()
+        em_execucao = {}  # future -> pk da tarefa
+        ultima_manutencao = 0
+        try:
+            while not self.parar:
+                if time.monotonic() - ultima_manutencao > 30:
+                    # Sinal de vida das tarefas em execução e recuperação das abandonadas.
+                    jobs.sinalizar_execucao(list(em_execucao.values()))
+                    recuperadas = jobs.recuperar_paradas(options['parada_ha'])
+                    if recuperadas:
+                        self.stdout.write(f'{recuperadas} tarefa(s) interrompida(s) devolvida(s) à fila.')
+                    ultima_manutencao = time.monotonic()
+
+                livres = self.processos - len(em_execucao)
+                if livres:
+                    for pk in jobs.assumir(self.trabalhador, livres):
+                        em_execucao[pool.submit(_executar, pk)] = pk
+                close_old_connections()
+
+                if not em_execucao:
+                    if options['uma_vez'] and not jobs.ha_tarefas_prontas():
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                prontas, _ = wait(list(em_execucao), timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                if self._concluir(prontas, em_execucao):
+                    # Um processo morreu (ex.: falta de memória): o pool inteiro fica inutilizável.
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    for pk in em_execucao.values():
+                        jobs.registrar_falha(pk, 'O processo do worker terminou inesperadamente.')
+                    em_execucao.clear()
+                    pool = self._pool()
+        finally:
+            self.stdout.write('Aguardando as tarefas em execução...')
+            pool.shutdown(wait=True)
+            self._concluir(list(em_execucao), em_execucao)
+
+    def _pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_iniciar_processo,
+        )
+
+    def _concluir(self, prontas, em_execucao):
+        """Relata as tarefas terminadas; devolve True se o pool quebrou."""
+        from app import jobs
+
+        quebrado = False
+        for future in prontas:
+            pk = em_execucao.pop(future)
+            erro = future.exception()
+            if isinstance(erro, BrokenProcessPool):
+                jobs.registrar_falha(pk, 'O processo do worker terminou inesperadamente.')
+                quebrado = True
+            elif erro is not None:
+                jobs.registrar_falha(pk, repr(erro))
+            else:
+                self.stdout.write(f'Tarefa {pk}: {future.result()}')
+        return quebrado
+
+    def _sinal(self, numero, frame):
+        self.parar = True
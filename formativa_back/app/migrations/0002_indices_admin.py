@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['periodo', 'data_inicio'], name='app_reserva_periodo_a40559_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sala',
+            index=models.Index(fields=['nome'], name='app_sala_nome_045750_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sala',
+            index=models.Index(fields=['periodo', 'nome'], name='app_sala_periodo_80bd8e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['tipo', 'username'], name='app_usuario_tipo_d99967_idx'),
+        ),
+    ]
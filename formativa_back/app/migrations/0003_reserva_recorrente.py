@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_indices_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaRecorrente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('MANHA', 'Manhã'), ('TARDE', 'Tarde'), ('NOITE', 'Noite')], help_text='Período da reserva (Manhã, Tarde, Noite).', max_length=5)),
+                ('dias_semana', models.PositiveSmallIntegerField(help_text='Dias da semana em bits (1 = segunda, 2 = terça, 4 = quarta ... 64 = domingo).')),
+                ('hora_inicio', models.TimeField(help_text='Horário de início de cada ocorrência.')),
+                ('hora_termino', models.TimeField(help_text='Horário de término de cada ocorrência.')),
+                ('data_inicio', models.DateField(help_text='Primeira data da recorrência.')),
+                ('data_fim', models.DateField(help_text='Última data da recorrência.')),
+                ('excecoes', models.JSONField(blank=True, default=list, help_text='Datas (AAAA-MM-DD) em que a reserva não ocorre.')),
+                ('disciplina', models.ForeignKey(help_text='Disciplina associada à reserva.', on_delete=django.db.models.deletion.CASCADE, related_name='reservas_recorrentes', to='app.disciplina')),
+                ('professor', models.ForeignKey(help_text='Professor responsável pela reserva.', limit_choices_to={'tipo': 'PROFESSOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='reservas_recorrentes', to=settings.AUTH_USER_MODEL)),
+                ('sala_reservada', models.ForeignKey(help_text='Sala reservada.', on_delete=django.db.models.deletion.CASCADE, related_name='reservas_recorrentes', to='app.sala')),
+            ],
+            options={
+                'verbose_name': 'Reserva recorrente',
+                'verbose_name_plural': 'Reservas recorrentes',
+                'indexes': [models.Index(fields=['sala_reservada', 'data_inicio', 'data_fim'], name='app_reserva_sala_re_333880_idx')],
+            },
+        ),
+    ]
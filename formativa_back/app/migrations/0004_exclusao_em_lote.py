@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_reserva_recorrente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sala',
+            name='exclusao_pendente',
+            field=models.BooleanField(default=False, help_text='Marcada para exclusão; as reservas estão sendo removidas em segundo plano.'),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='exclusao_pendente',
+            field=models.BooleanField(default=False, help_text='Marcado para exclusão; os dependentes estão sendo removidos em segundo plano.'),
+        ),
+        migrations.CreateModel(
+            name='ExclusaoEmLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('usuario', 'Usuário'), ('sala', 'Sala')], help_text='Tipo do objeto excluído.', max_length=10)),
+                ('objeto_id', models.BigIntegerField(help_text='ID do objeto excluído.')),
+                ('descricao', models.CharField(help_text='Descrição do objeto no momento da solicitação.', max_length=255)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Executando'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PENDENTE', help_text='Situação da exclusão.', max_length=10)),
+                ('etapa', models.CharField(blank=True, default='', help_text='Etapa em execução.', max_length=50)),
+                ('removidos', models.PositiveIntegerField(default=0, help_text='Linhas removidas ou desvinculadas até agora.')),
+                ('total_estimado', models.PositiveIntegerField(default=0, help_text='Linhas dependentes estimadas na solicitação.')),
+                ('erro', models.TextField(blank=True, default='', help_text='Mensagem do último erro.')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, help_text='Gestor que solicitou a exclusão.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exclusão em lote',
+                'verbose_name_plural': 'Exclusões em lote',
+                'indexes': [models.Index(fields=['status'], name='app_exclusa_status_7fae71_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_exclusao_em_lote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exclusaoemlote',
+            name='campus',
+            field=models.CharField(blank=True, default='', help_text='Campus da sala excluída.', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='disciplina',
+            name='professor',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Professor responsável pela disciplina.', limit_choices_to={'tipo': 'PROFESSOR'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='disciplinas', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='professor',
+            field=models.ForeignKey(db_constraint=False, help_text='Professor responsável pela reserva.', limit_choices_to={'tipo': 'PROFESSOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='reservarecorrente',
+            name='professor',
+            field=models.ForeignKey(db_constraint=False, help_text='Professor responsável pela reserva.', limit_choices_to={'tipo': 'PROFESSOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='reservas_recorrentes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='sala',
+            name='professor',
+            field=models.ForeignKey(db_constraint=False, help_text='Professor responsável pela sala, se aplicável.', limit_choices_to={'tipo': 'PROFESSOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='salas', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_campus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(help_text='Nome da tarefa registrada em app/tasks.py.', max_length=100)),
+                ('argumentos', models.JSONField(blank=True, default=dict, help_text='Argumentos (args e kwargs) da tarefa.')),
+                ('campus', models.CharField(blank=True, default='', help_text='Campus ativo ao enfileirar.', max_length=30)),
+                ('prioridade', models.SmallIntegerField(default=0, help_text='Maior prioridade é executada primeiro.')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Executando'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PENDENTE', help_text='Situação da tarefa.', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, help_text='Execuções iniciadas até agora.')),
+                ('max_tentativas', models.PositiveSmallIntegerField(default=3, help_text='Execuções permitidas antes do erro definitivo.')),
+                ('executar_apos', models.DateTimeField(default=django.utils.timezone.now, help_text='A tarefa só é assumida a partir deste instante.')),
+                ('resultado', models.JSONField(blank=True, help_text='Valor devolvido pela tarefa.', null=True)),
+                ('erro', models.TextField(blank=True, default='', help_text='Mensagem do último erro.')),
+                ('trabalhador', models.CharField(blank=True, default='', help_text='Worker que assumiu a tarefa.', max_length=100)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, help_text='Usuário que solicitou a tarefa.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'indexes': [models.Index(fields=['status', 'prioridade', 'executar_apos'], name='app_tarefa_status_626269_idx')],
+            },
+        ),
+    ]
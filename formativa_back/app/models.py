@@ -2,7 +2,10 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from datetime import datetime, time, timedelta
+from django.utils import timezone
 from .constants import TIPO_USUARIO, PERIODO_CHOICES
+from . import recurrence
 
 
 class Usuario(AbstractUser):
@@ -40,6 +43,10 @@ class Usuario(AbstractUser):
         null=True,
         help_text="Data de contratação do usuário."
     )
+    exclusao_pendente = models.BooleanField(
+        default=False,
+        help_text="Marcado para exclusão; os dependentes estão sendo removidos em segundo plano."
+    )
 
     REQUIRED_FIELDS = ['ni', 'email', 'tipo']  # Ajustado para consistência com blank/null
 
@@ -47,7 +54,10 @@ class Usuario(AbstractUser):
         return f"{self.get_tipo_display()} - {self.username} ({self.ni})"
 
     class Meta:
-        indexes = [models.Index(fields=['ni'])]
+        indexes = [
+            models.Index(fields=['ni']),
+            models.Index(fields=['tipo', 'username']),
+        ]
         verbose_name = "Usuário"
         verbose_name_plural = "Usuários"
 
@@ -65,6 +75,7 @@ class Disciplina(models.Model):
         null=True,
         blank=True,
         limit_choices_to={'tipo': 'PROFESSOR'},
+        db_constraint=False,  # Usuários ficam no banco global; ver app/routers.py
         help_text="Professor responsável pela disciplina."
     )
 
@@ -99,9 +110,14 @@ class Sala(models.Model):
         null=False,
         blank=False,
         limit_choices_to={'tipo': 'PROFESSOR'},
+        db_constraint=False,  # Usuários ficam no banco global; ver app/routers.py
         help_text="Professor responsável pela sala, se aplicável."
     )
     periodo = models.CharField(max_length=5, choices=PERIODO_CHOICES, help_text="Período em que a sala está disponível.")
+    exclusao_pendente = models.BooleanField(
+        default=False,
+        help_text="Marcada para exclusão; as reservas estão sendo removidas em segundo plano."
+    )
 
     def save(self, *args, **kwargs):
         """Garante que um professor não seja associado a mais de uma sala."""
@@ -117,6 +133,10 @@ class Sala(models.Model):
         return f"Sala {self.nome} (Capacidade: {self.capacidade})"
 
     class Meta:
+        indexes = [
+            models.Index(fields=['nome']),
+            models.Index(fields=['periodo', 'nome']),
+        ]
         verbose_name = "Sala"
         verbose_name_plural = "Salas"
 
@@ -141,6 +161,7 @@ class Reserva(models.Model):
         on_delete=models.CASCADE,
         related_name='reservas',
         limit_choices_to={'tipo': 'PROFESSOR'},
+        db_constraint=False,  # Usuários ficam no banco global; ver app/routers.py
         help_text="Professor responsável pela reserva."
     )
     disciplina = models.ForeignKey(
@@ -150,8 +171,8 @@ class Reserva(models.Model):
         help_text="Disciplina associada à reserva."
     )
 
-    def save(self, *args, **kwargs):
-        """Valida que não há conflitos de horário para a mesma sala."""
+    def verificar_conflitos(self):
+        """Valida o horário e os conflitos com outras reservas e regras recorrentes da sala."""
         if self.data_termino <= self.data_inicio:
             raise ValidationError("A data de término deve ser posterior à data de início.")
 
@@ -166,6 +187,21 @@ class Reserva(models.Model):
         if overlapping.exists():
             raise ValidationError("A sala já está reservada para este período.")
 
+        # Verifica conflitos com as reservas recorrentes da sala
+        inicio_local = timezone.localtime(self.data_inicio).date()
+        termino_local = timezone.localtime(self.data_termino).date()
+        regras = ReservaRecorrente.objects.filter(
+            sala_reservada=self.sala_reservada,
+            data_inicio__lte=termino_local,
+            data_fim__gte=inicio_local,
+        )
+        for regra in regras:
+            if recurrence.regra_conflita_com_intervalo(regra, self.data_inicio, self.data_termino):
+                raise ValidationError("A sala já está reservada para este período (reserva recorrente).")
+
+    def save(self, *args, **kwargs):
+        """Valida que não há conflitos de horário para a mesma sala."""
+        self.verificar_conflitos()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -174,7 +210,197 @@ class Reserva(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['data_inicio', 'data_termino']),
-            models.Index(fields=['sala_reservada'])
+            models.Index(fields=['sala_reservada']),
+            models.Index(fields=['periodo', 'data_inicio']),
         ]
         verbose_name = "Reserva"
         verbose_name_plural = "Reservas"
+
+
+class ReservaRecorrente(models.Model):
+    """Modelo para reservas semanais de salas, guardadas como regra.
+
+    As ocorrências não viram linhas em Reserva: são calculadas sob demanda por
+    app/recurrence.py, apenas na janela consultada.
+    """
+    sala_reservada = models.ForeignKey(
+        Sala,
+        on_delete=models.CASCADE,
+        related_name='reservas_recorrentes',
+        help_text="Sala reservada."
+    )
+    professor = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='reservas_recorrentes',
+        limit_choices_to={'tipo': 'PROFESSOR'},
+        db_constraint=False,  # Usuários ficam no banco global; ver app/routers.py
+        help_text="Professor responsável pela reserva."
+    )
+    disciplina = models.ForeignKey(
+        Disciplina,
+        on_delete=models.CASCADE,
+        related_name='reservas_recorrentes',
+        help_text="Disciplina associada à reserva."
+    )
+    periodo = models.CharField(
+        max_length=5,
+        choices=PERIODO_CHOICES,
+        help_text="Período da reserva (Manhã, Tarde, Noite)."
+    )
+    dias_semana = models.PositiveSmallIntegerField(
+        help_text="Dias da semana em bits (1 = segunda, 2 = terça, 4 = quarta ... 64 = domingo)."
+    )
+    hora_inicio = models.TimeField(help_text="Horário de início de cada ocorrência.")
+    hora_termino = models.TimeField(help_text="Horário de término de cada ocorrência.")
+    data_inicio = models.DateField(help_text="Primeira data da recorrência.")
+    data_fim = models.DateField(help_text="Última data da recorrência.")
+    excecoes = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Datas (AAAA-MM-DD) em que a reserva não ocorre."
+    )
+
+    def verificar_conflitos(self):
+        """Valida a regra e os conflitos com outras regras e reservas da sala."""
+        if self.hora_termino <= self.hora_inicio:
+            raise ValidationError("O horário de término deve ser posterior ao de início.")
+        if self.data_fim < self.data_inicio:
+            raise ValidationError("A data final deve ser igual ou posterior à data inicial.")
+        if not self.dias_semana or self.dias_semana & ~recurrence.MASCARA_SEMANA:
+            raise ValidationError("Informe ao menos um dia da semana válido.")
+
+        regras = ReservaRecorrente.objects.filter(
+            sala_reservada=self.sala_reservada,
+            data_inicio__lte=self.data_fim,
+            data_fim__gte=self.data_inicio,
+        )
+        if self.pk:
+            regras = regras.exclude(pk=self.pk)
+        for regra in regras:
+            if recurrence.regras_conflitam(self, regra):
+                raise ValidationError("A sala já possui uma reserva recorrente neste horário.")
+
+        avulsas = Reserva.objects.filter(
+            sala_reservada=self.sala_reservada,
+            data_inicio__lt=timezone.make_aware(datetime.combine(self.data_fim + timedelta(days=1), time.min)),
+            data_termino__gt=timezone.make_aware(datetime.combine(self.data_inicio, time.min)),
+        ).only('data_inicio', 'data_termino')
+        for reserva in avulsas.iterator():
+            if recurrence.regra_conflita_com_intervalo(self, reserva.data_inicio, reserva.data_termino):
+                raise ValidationError("A sala já está reservada em uma das ocorrências.")
+
+    def save(self, *args, **kwargs):
+        """Valida que não há conflitos de horário para a mesma sala."""
+        self.verificar_conflitos()
+        super().save(*args, **kwargs)
+
+    def ocorrencias(self, inicio, fim):
+        """Gera (início, término) das ocorrências dentro de [inicio, fim)."""
+        return recurrence.ocorrencias(self, inicio, fim)
+
+    def __str__(self):
+        dias = ', '.join(recurrence.DIAS_SEMANA[d] for d in recurrence.dias(self.dias_semana))
+        return (f"Reserva recorrente {self.sala_reservada.nome} ({dias}) "
+                f"{self.hora_inicio.strftime('%H:%M')} - {self.hora_termino.strftime('%H:%M')}")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sala_reservada', 'data_inicio', 'data_fim']),
+        ]
+        verbose_name = "Reserva recorrente"
+        verbose_name_plural = "Reservas recorrentes"
+
+
+class ExclusaoEmLote(models.Model):
+    """Acompanha a exclusão em segundo plano de um Usuario ou Sala e seus dependentes.
+
+    O objeto é marcado com `exclusao_pendente` na hora e os dependentes são
+    removidos em lotes por app/deletion.py, cada lote na sua transação. Se o
+    processo cair no meio, a exclusão é retomada de onde parou.
+    """
+    MODELO_CHOICES = [
+        ('usuario', 'Usuário'),
+        ('sala', 'Sala'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('EXECUTANDO', 'Executando'),
+        ('CONCLUIDA', 'Concluída'),
+        ('ERRO', 'Erro'),
+    ]
+    modelo = models.CharField(max_length=10, choices=MODELO_CHOICES, help_text="Tipo do objeto excluído.")
+    objeto_id = models.BigIntegerField(help_text="ID do objeto excluído.")
+    campus = models.CharField(max_length=30, blank=True, default='', help_text="Campus da sala excluída.")
+    descricao = models.CharField(max_length=255, help_text="Descrição do objeto no momento da solicitação.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDENTE', help_text="Situação da exclusão.")
+    etapa = models.CharField(max_length=50, blank=True, default='', help_text="Etapa em execução.")
+    removidos = models.PositiveIntegerField(default=0, help_text="Linhas removidas ou desvinculadas até agora.")
+    total_estimado = models.PositiveIntegerField(default=0, help_text="Linhas dependentes estimadas na solicitação.")
+    erro = models.TextField(blank=True, default='', help_text="Mensagem do último erro.")
+    solicitado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Gestor que solicitou a exclusão."
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Exclusão {self.descricao} ({self.get_status_display()})"
+
+    class Meta:
+        indexes = [models.Index(fields=['status'])]
+        verbose_name = "Exclusão em lote"
+        verbose_name_plural = "Exclusões em lote"
+
+
+class Tarefa(models.Model):
+    """Tarefa pesada executada fora do request pelo worker (manage.py worker).
+
+    A fila fica no próprio banco: o request só grava a linha e o worker a
+    assume com um UPDATE condicional, executa a função registrada em
+    app/tasks.py e grava o resultado. Falhas voltam para a fila com espera
+    crescente até `max_tentativas`.
+    """
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('EXECUTANDO', 'Executando'),
+        ('CONCLUIDA', 'Concluída'),
+        ('ERRO', 'Erro'),
+    ]
+    nome = models.CharField(max_length=100, help_text="Nome da tarefa registrada em app/tasks.py.")
+    argumentos = models.JSONField(default=dict, blank=True, help_text="Argumentos (args e kwargs) da tarefa.")
+    campus = models.CharField(max_length=30, blank=True, default='', help_text="Campus ativo ao enfileirar.")
+    prioridade = models.SmallIntegerField(default=0, help_text="Maior prioridade é executada primeiro.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDENTE', help_text="Situação da tarefa.")
+    tentativas = models.PositiveSmallIntegerField(default=0, help_text="Execuções iniciadas até agora.")
+    max_tentativas = models.PositiveSmallIntegerField(default=3, help_text="Execuções permitidas antes do erro definitivo.")
+    executar_apos = models.DateTimeField(default=timezone.now, help_text="A tarefa só é assumida a partir deste instante.")
+    resultado = models.JSONField(null=True, blank=True, help_text="Valor devolvido pela tarefa.")
+    erro = models.TextField(blank=True, default='', help_text="Mensagem do último erro.")
+    trabalhador = models.CharField(max_length=100, blank=True, default='', help_text="Worker que assumiu a tarefa.")
+    solicitado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Usuário que solicitou a tarefa."
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Tarefa {self.nome} #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'prioridade', 'executar_apos'])]
+        verbose_name = "Tarefa"
+        verbose_name_plural = "Tarefas"
@@ -27,10 +27,13 @@ class IsProfessorOrGestor(BasePermission):
         """Verifica permissões no nível do objeto (visualizar/atualizar/excluir).
         
         - Gestores têm acesso a qualquer objeto.
-        - Professores têm acesso apenas aos objetos onde são o professor responsável.
+        - Professores têm acesso apenas aos objetos onde são o professor responsável
+          (ou, nas tarefas da fila, quem as solicitou).
         """
         if request.user.tipo == 'GESTOR':
             return True
-        # Verifica se o objeto tem 'professor' ou 'professor_responsavel'
-        professor_field = getattr(obj, 'professor', getattr(obj, 'professor_responsavel', None))
-        return professor_field == request.user
\ No newline at end of file
+        # Compara pelo *_id para não carregar o usuário do objeto (uma query a menos).
+        for campo in ('professor', 'professor_responsavel', 'solicitado_por'):
+            if hasattr(obj, f'{campo}_id'):
+                return getattr(obj, f'{campo}_id') == request.user.pk
+        return False
\ No newline at end of file
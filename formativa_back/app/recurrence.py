@@ -0,0 +1,118 @@
+"""
+Aritmética das reservas recorrentes (ReservaRecorrente).
+
+Uma regra ocupa a sala das `hora_inicio` às `hora_termino` em todo dia da
+semana marcado na máscara `dias_semana` (bit 0 = segunda ... bit 6 = domingo)
+entre `data_inicio` e `data_fim`, exceto nas datas de `excecoes`. Os conflitos
+são calculados sem gerar as ocorrências da regra; apenas as listagens expandem
+ocorrências, e só dentro da janela pedida.
+
+"""
+
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+DIAS_SEMANA = ('Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo')
+MASCARA_SEMANA = 0b1111111
+
+
+def mascara(dias):
+    """Converte uma lista de dias (0 = segunda) na máscara de bits."""
+    return sum(1 << dia for dia in set(dias))
+
+
+def dias(mascara_dias):
+    """Converte a máscara de bits na lista de dias (0 = segunda)."""
+    return [dia for dia in range(7) if mascara_dias & (1 << dia)]
+
+
+def contar_dias(inicio, fim, mascara_dias):
+    """Quantas datas em [inicio, fim] caem num dia da semana da máscara."""
+    if fim < inicio or not mascara_dias:
+        return 0
+    total_dias = (fim - inicio).days + 1
+    semanas, resto = divmod(total_dias, 7)
+    total = semanas * bin(mascara_dias & MASCARA_SEMANA).count('1')
+    # As semanas completas terminam no mesmo dia da semana em que começaram.
+    for deslocamento in range(resto):
+        if mascara_dias & (1 << ((inicio.weekday() + deslocamento) % 7)):
+            total += 1
+    return total
+
+
+def datas_excecao(regra):
+    """Conjunto de datas (date) em que a regra não ocorre."""
+    return {date.fromisoformat(d) if isinstance(d, str) else d for d in regra.excecoes or ()}
+
+
+def ocorre_em(regra, dia, excecoes=None):
+    """Indica se a regra tem ocorrência na data `dia`."""
+    if excecoes is None:
+        excecoes = datas_excecao(regra)
+    return (
+        regra.data_inicio <= dia <= regra.data_fim
+        and regra.dias_semana & (1 << dia.weekday())
+        and dia not in excecoes
+    )
+
+
+def intervalo_em(regra, dia):
+    """Início e término (datetimes com fuso) da ocorrência da regra em `dia`."""
+    return (
+        timezone.make_aware(datetime.combine(dia, regra.hora_inicio)),
+        timezone.make_aware(datetime.combine(dia, regra.hora_termino)),
+    )
+
+
+def regras_conflitam(a, b):
+    """Indica se duas regras da mesma sala têm alguma ocorrência sobreposta.
+
+    Os horários precisam se cruzar e precisa existir ao menos uma data comum
+    às duas regras que não seja exceção de nenhuma delas. Conta as datas com
+    `contar_dias` e desconta as exceções que caem nelas.
+    """
+    if not (a.hora_inicio < b.hora_termino and b.hora_inicio < a.hora_termino):
+        return False
+    comum = a.dias_semana & b.dias_semana
+    inicio, fim = max(a.data_inicio, b.data_inicio), min(a.data_fim, b.data_fim)
+    candidatas = contar_dias(inicio, fim, comum)
+    if not candidatas:
+        return False
+    excluidas = {
+        d for d in datas_excecao(a) | datas_excecao(b)
+        if inicio <= d <= fim and comum & (1 << d.weekday())
+    }
+    return candidatas > len(excluidas)
+
+
+def regra_conflita_com_intervalo(regra, inicio, fim):
+    """Indica se a regra ocupa a sala em algum momento de [inicio, fim).
+
+    Só percorre as datas cobertas pelo intervalo (uma reserva avulsa dura
+    horas), nunca as ocorrências da regra inteira.
+    """
+    inicio_local, fim_local = timezone.localtime(inicio), timezone.localtime(fim)
+    excecoes = datas_excecao(regra)
+    dia = max(inicio_local.date(), regra.data_inicio)
+    ultimo = min(fim_local.date(), regra.data_fim)
+    while dia <= ultimo:
+        if ocorre_em(regra, dia, excecoes):
+            ocorrencia_inicio, ocorrencia_fim = intervalo_em(regra, dia)
+            if ocorrencia_inicio < fim and inicio < ocorrencia_fim:
+                return True
+        dia += timedelta(days=1)
+    return False
+
+
+def ocorrencias(regra, inicio, fim):
+    """Gera (início, término) das ocorrências da regra que cruzam [inicio, fim)."""
+    excecoes = datas_excecao(regra)
+    dia = max(timezone.localtime(inicio).date(), regra.data_inicio)
+    ultimo = min(timezone.localtime(fim).date(), regra.data_fim)
+    while dia <= ultimo:
+        if ocorre_em(regra, dia, excecoes):
+            ocorrencia_inicio, ocorrencia_fim = intervalo_em(regra, dia)
+            if ocorrencia_inicio < fim and inicio < ocorrencia_fim:
+                yield ocorrencia_inicio, ocorrencia_fim
+        dia += timedelta(days=1)
@@ -0,0 +1,225 @@
+"""
+Réplicas de leitura com consistência read-your-writes.
+
+Cada banco primário (o `default` e, com DB_CAMPI, o de cada campus) pode ter
+réplicas em settings.DATABASE_REPLICAS. O ReplicaRouter manda as leituras para
+uma réplica saudável e as escritas sempre para o primário.
+
+Depois que um usuário escreve, as leituras dele ficam no primário por
+REPLICAS['FIXAR_APOS_ESCRITA'] segundos, para que uma reserva recém-criada
+apareça na listagem seguinte mesmo com atraso de replicação. A marcação fica
+no cache do Django, indexada pelo user_id do JWT; com vários workers o cache
+precisa ser compartilhado (DJANGO_CACHE_DIR).
+
+Continuam no primário: requests que não são GET/HEAD/OPTIONS, leituras dentro
+de `transaction.atomic()` e tudo que for executado depois de uma escrita no
+mesmo request ou thread.
+
+"""
+
+import contextvars
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .routers import CampusRouter
+from .throttling import claims_do_token
+
+METODOS_SEGUROS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Estado do request (ou thread) atual: {'primario': bool, 'escreveu': bool,
+# 'replicas': {alias primário: réplica escolhida}}. É um dicionário mutável para que escritas feitas em contextos copiados
+# (sync_to_async) também fixem o restante do request no primário.
+_estado = contextvars.ContextVar('estado_replicas', default=None)
+
+
+def replicas():
+    """Mapa alias primário -> lista de aliases das réplicas."""
+    return getattr(settings, 'DATABASE_REPLICAS', {})
+
+
+def configuracao():
+    return getattr(settings, 'REPLICAS', {})
+
+
+def primario_do_alias(alias):
+    """Alias primário de uma réplica (o próprio alias se ele já for primário)."""
+    for primario, aliases in replicas().items():
+        if alias in aliases:
+            return primario
+    return alias
+
+
+def _estado_atual():
+    estado = _estado.get()
+    if estado is None:
+        estado = {'primario': False, 'escreveu': False, 'replicas': {}}
+        _estado.set(estado)
+    return estado
+
+
+def chave_fixacao(usuario_id):
+    return f'replicas:fixar:{usuario_id}'
+
+
+class SaudeReplicas:
+    """Guarda o resultado da última verificação de cada réplica.
+
+    Cada réplica é verificada no máximo uma vez a cada INTERVALO_SAUDE segundos
+    por processo; enquanto uma verificação está em andamento, os outros requests
+    usam o último resultado em vez de esperar.
+    """
+
+    def __init__(self):
+        self._estado = {}
+        self._lock = threading.Lock()
+
+    def saudavel(self, alias):
+        intervalo = configuracao().get('INTERVALO_SAUDE', 5)
+        agora = time.monotonic()
+        with self._lock:
+            ok, verificado_em = self._estado.get(alias, (True, None))
+            if verificado_em is not None and agora - verificado_em < intervalo:
+                return ok
+            self._estado[alias] = (ok, agora)
+        ok = self.verificar(alias)
+        with self._lock:
+            self._estado[alias] = (ok, time.monotonic())
+        return ok
+
+    def verificar(self, alias):
+        """Conecta na réplica e confere se ela responde e não está atrasada demais."""
+        conexao = connections[alias]
+        try:
+            with conexao.cursor() as cursor:
+                cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+                atraso = self._atraso(conexao, cursor)
+        except DatabaseError:
+            conexao.close()
+            return False
+        return atraso is None or atraso <= configuracao().get('ATRASO_MAXIMO', 10)
+
+    def _atraso(self, conexao, cursor):
+        """Segundos de atraso da replicação, quando o banco informa (MySQL/PostgreSQL).
+
+        None quando não há como saber (sem permissão, banco que não é réplica);
+        infinito quando a réplica informa que a replicação está parada.
+        """
+        try:
+            if conexao.vendor == 'mysql':
+                cursor.execute('SHOW REPLICA STATUS')
+                linha = cursor.fetchone()
+                if linha is None:
+                    return None
+                colunas = [c[0] for c in cursor.description]
+                atraso = linha[colunas.index('Seconds_Behind_Source')]
+                # NULL com a linha de status presente: a replicação está parada.
+                return float('inf') if atraso is None else atraso
+            if conexao.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT CASE WHEN pg_is_in_recovery() '
+                    'THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+                )
+                return cursor.fetchone()[0]
+        except (DatabaseError, ValueError):
+            # Sem permissão para ler o status: vale só o teste de conexão.
+            return None
+        return None
+
+    def esquecer(self):
+        with self._lock:
+            self._estado.clear()
+
+
+saude_replicas = SaudeReplicas()
+
+
+class ReplicaRouter:
+    """Leituras em réplicas saudáveis, escritas no primário.
+
+    Fica antes do CampusRouter em DATABASE_ROUTERS e usa o mesmo critério para
+    descobrir o primário (o banco do campus ou o `default`).
+    """
+
+    def __init__(self):
+        self._campus = CampusRouter()
+
+    def _primario(self, model, **hints):
+        banco = self._campus._banco(model, **hints)
+        if banco is None:
+            instance = hints.get('instance')
+            banco = instance._state.db if instance is not None and instance._state.db else DEFAULT_DB_ALIAS
+        return primario_do_alias(banco)
+
+    def db_for_read(self, model, **hints):
+        if not replicas():
+            return None
+        primario = self._primario(model, **hints)
+        candidatas = replicas().get(primario)
+        estado = _estado_atual()
+        if not candidatas or estado['primario'] or connections[primario].in_atomic_block:
+            return primario
+        # Uma réplica por request: réplicas com atrasos diferentes na mesma
+        # resposta mostrariam dados de momentos diferentes. Só troca se ela cair.
+        escolhida = estado['replicas'].get(primario)
+        if escolhida is not None and saude_replicas.saudavel(escolhida):
+            return escolhida
+        saudaveis = [alias for alias in candidatas if saude_replicas.saudavel(alias)]
+        if not saudaveis:
+            return primario
+        estado['replicas'][primario] = random.choice(saudaveis)
+        return estado['replicas'][primario]
+
+    def db_for_write(self, model, **hints):
+        if not replicas():
+            return None
+        estado = _estado_atual()
+        estado['primario'] = estado['escreveu'] = True
+        return self._primario(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not replicas():
+            return None
+        if primario_do_alias(obj1._state.db) == primario_do_alias(obj2._state.db):
+            return True
+        # Bancos diferentes: quem decide é o CampusRouter.
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Réplicas recebem o schema pela replicação, nunca pelo migrate."""
+        if db in {alias for aliases in replicas().values() for alias in aliases}:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Decide, por request, se as leituras podem ir para as réplicas.
+
+    Fixa no primário os requests de escrita e os de usuários que escreveram
+    há menos de FIXAR_APOS_ESCRITA segundos. O usuário vem das claims do JWT,
+    sem consultar o banco.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+        claims = claims_do_token(request)
+        usuario_id = claims[0] if claims else None
+        fixado = request.method not in METODOS_SEGUROS or (
+            usuario_id is not None and cache.get(chave_fixacao(usuario_id)) is not None
+        )
+        estado = {'primario': fixado, 'escreveu': False, 'replicas': {}}
+        token = _estado.set(estado)
+        try:
+            return self.get_response(request)
+        finally:
+            _estado.reset(token)
+            if estado['escreveu'] and usuario_id is not None:
+                cache.set(chave_fixacao(usuario_id), True, configuracao().get('FIXAR_APOS_ESCRITA', 10))
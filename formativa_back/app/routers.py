@@ -0,0 +1,135 @@
+"""
+Roteamento de banco por campus.
+
+Salas, disciplinas e reservas de cada campus ficam no banco do campus
+(settings.CAMPI: código -> alias). Usuários, autenticação e o restante do
+Django ficam sempre no banco `default`. Sem CAMPI configurado, tudo fica no
+`default`, como antes.
+
+O campus do request vem do header X-Campus (CampusMiddleware) e vale para as
+queries feitas durante o request. Consultas em mais de um campus precisam ser
+explícitas, com `usar_campus()` ou `para_cada_campus()`.
+
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import JsonResponse
+
+MODELOS_POR_CAMPUS = frozenset({'sala', 'disciplina', 'reserva', 'reservarecorrente'})
+
+_campus_atual = contextvars.ContextVar('campus_atual', default=None)
+
+
+def campi():
+    """Mapa código do campus -> alias do banco."""
+    return getattr(settings, 'CAMPI', {})
+
+
+def campus_padrao():
+    return getattr(settings, 'CAMPUS_PADRAO', None) or next(iter(campi()), None)
+
+
+def campus_atual():
+    """Código do campus do contexto atual (ou o campus padrão)."""
+    return _campus_atual.get() or campus_padrao()
+
+
+def alias_do_campus(codigo=None):
+    """Alias do banco do campus (o do contexto atual se `codigo` for None)."""
+    codigo = codigo or campus_atual()
+    return campi().get(codigo, DEFAULT_DB_ALIAS)
+
+
+def campus_do_alias(alias):
+    """Código do campus dono do alias (None para o banco global)."""
+    for codigo, alias_campus in campi().items():
+        if alias_campus == alias:
+            return codigo
+    return None
+
+
+@contextmanager
+def usar_campus(codigo):
+    """Executa o bloco com as queries por campus apontando para `codigo`."""
+    if codigo is not None and codigo not in campi():
+        raise ValueError(f'Campus desconhecido: {codigo}')
+    token = _campus_atual.set(codigo)
+    try:
+        yield
+    finally:
+        _campus_atual.reset(token)
+
+
+def para_cada_campus():
+    """Percorre todos os campi, ativando cada um; uso explícito para consultas entre campi."""
+    for codigo in campi() or [None]:
+        with usar_campus(codigo):
+            yield codigo
+
+
+def eh_modelo_por_campus(model):
+    return model._meta.app_label == 'app' and model._meta.model_name in MODELOS_POR_CAMPUS
+
+
+class CampusRouter:
+    """Envia os modelos por campus para o banco do campus e o resto para o `default`."""
+
+    def _banco(self, model, **hints):
+        if not campi():
+            return None
+        if not eh_modelo_por_campus(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and eh_modelo_por_campus(type(instance)) and instance._state.db:
+            return instance._state.db
+        return alias_do_campus()
+
+    db_for_read = _banco
+    db_for_write = _banco
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not campi():
+            return None
+        por_campus = eh_modelo_por_campus(type(obj1)), eh_modelo_por_campus(type(obj2))
+        if all(por_campus):
+            return obj1._state.db == obj2._state.db
+        # Usuários são globais: qualquer campus pode apontar para eles.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Modelos globais só no `default`; modelos por campus em todos os bancos.
+
+        As tabelas por campus também existem (vazias) no `default` para que o
+        collector do Django consiga excluir um Usuario sem erro de tabela
+        inexistente; os dependentes reais são removidos por app/deletion.py.
+        """
+        if not campi():
+            return None
+        if app_label == 'app' and model_name in MODELOS_POR_CAMPUS:
+            return True
+        return db not in campi().values()
+
+
+class CampusMiddleware:
+    """Define o campus do request a partir do header X-Campus.
+
+    Requests OPTIONS (preflight de CORS) não trazem o header e passam com o
+    campus padrão.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        codigo = request.headers.get('X-Campus') or campus_padrao()
+        if request.method == 'OPTIONS' and codigo not in campi():
+            codigo = campus_padrao()
+        if campi() and codigo not in campi():
+            return JsonResponse({'detail': f'Campus desconhecido: {codigo}.'}, status=400)
+        request.campus = codigo
+        with usar_campus(codigo):
+            return self.get_response(request)
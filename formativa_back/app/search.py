@@ -0,0 +1,252 @@
+"""
+Índice em memória para a busca por prefixo (typeahead) de usuários, salas e
+disciplinas.
+
+Cada documento é quebrado em termos normalizados (minúsculos e sem acento)
+guardados numa lista ordenada; a busca por prefixo é uma busca binária nessa
+lista. O índice é montado na primeira busca, mantido pelos sinais de
+app/signals.py e remontado a cada SEARCH_INDEX_TTL segundos para pegar
+alterações feitas por outros processos. Há um índice por campus (salas e
+disciplinas do campus, usuários globais).
+
+A remontagem lê o banco sem segurar o lock; as alterações feitas pelos sinais
+enquanto ela roda ficam num diário e são reaplicadas sobre o índice novo na
+troca, para não se perderem.
+
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.db import connections
+
+from .routers import alias_do_campus, campus_atual
+
+USUARIO, SALA, DISCIPLINA = 'usuario', 'sala', 'disciplina'
+TIPOS = (USUARIO, SALA, DISCIPLINA)
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """Remove acentos e caixa para comparar 'João' com 'joao'."""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def termos(*valores):
+    """Quebra os valores em termos indexáveis, sem repetição."""
+    encontrados = []
+    for valor in valores:
+        for termo in _SEPARADORES.split(normalizar(valor)):
+            if termo and termo not in encontrados:
+                encontrados.append(termo)
+    return tuple(encontrados)
+
+
+def documento_usuario(usuario):
+    nome = f'{usuario.first_name} {usuario.last_name}'.strip()
+    texto = f'{nome} ({usuario.username})' if nome else usuario.username
+    # Só a parte local do e-mail: o domínio é igual para quase todos.
+    email = (usuario.email or '').split('@')[0]
+    return texto, termos(usuario.username, usuario.first_name, usuario.last_name, usuario.ni, email)
+
+
+def documento_sala(sala):
+    return f'Sala {sala.nome}', termos(sala.nome)
+
+
+def documento_disciplina(disciplina):
+    return f'{disciplina.nome} ({disciplina.curso})', termos(disciplina.nome, disciplina.curso)
+
+
+class IndiceBusca:
+    """Listas ordenadas de (termo, pk), uma por tipo, com os documentos indexados."""
+
+    def __init__(self, campus=None):
+        self.campus = campus
+        self._termos = {tipo: [] for tipo in TIPOS}
+        self._documentos = {}
+        self._lock = threading.RLock()
+        self._lock_carga = threading.Lock()  # uma montagem inicial por vez; não bloqueia os sinais
+        self._construido_em = None
+        self._renovando = False
+        self._diarios = []  # um por montagem em andamento: [(operação, argumentos)]
+
+    def __len__(self):
+        return len(self._documentos)
+
+    def construir(self, documentos):
+        """Substitui o conteúdo do índice por `documentos` (tipo, pk, texto, termos).
+
+        Adições e remoções feitas enquanto `documentos` é percorrido são
+        reaplicadas sobre o conteúdo novo.
+        """
+        diario = []
+        with self._lock:
+            self._diarios.append(diario)
+        try:
+            novos_documentos = {}
+            novos_termos = {tipo: [] for tipo in TIPOS}
+            for tipo, pk, texto, termos_doc in documentos:
+                novos_documentos[(tipo, pk)] = (texto, termos_doc)
+                novos_termos[tipo].extend((termo, pk) for termo in termos_doc)
+            for lista in novos_termos.values():
+                lista.sort()
+        except BaseException:
+            with self._lock:
+                self._diarios.remove(diario)
+            raise
+        with self._lock:
+            self._diarios.remove(diario)
+            self._documentos = novos_documentos
+            self._termos = novos_termos
+            for operacao, argumentos in diario:
+                operacao(*argumentos)
+            self._construido_em = time.monotonic()
+
+    def carregar(self):
+        """Monta o índice a partir do banco (uma query por modelo)."""
+        from .models import Usuario, Sala, Disciplina
+
+        banco = alias_do_campus(self.campus)
+
+        def documentos():
+            campos = ('pk', 'username', 'first_name', 'last_name', 'ni', 'email')
+            for usuario in Usuario.objects.filter(exclusao_pendente=False).only(*campos).iterator(chunk_size=2000):
+                yield (USUARIO, usuario.pk, *documento_usuario(usuario))
+            for sala in Sala.objects.using(banco).filter(exclusao_pendente=False).only('pk', 'nome').iterator(chunk_size=2000):
+                yield (SALA, sala.pk, *documento_sala(sala))
+            for disciplina in Disciplina.objects.using(banco).only('pk', 'nome', 'curso').iterator(chunk_size=2000):
+                yield (DISCIPLINA, disciplina.pk, *documento_disciplina(disciplina))
+
+        self.construir(documentos())
+
+    def _garantir_atualizado(self):
+        """Monta o índice na primeira busca e o renova em segundo plano quando expira."""
+        if self._construido_em is None:
+            # A leitura do banco roda fora de self._lock: adicionar/remover dos
+            # sinais seguem livres e entram no diário de construir().
+            with self._lock_carga:
+                if self._construido_em is None:
+                    self.carregar()
+            return
+        ttl = getattr(settings, 'SEARCH_INDEX_TTL', 300)
+        if time.monotonic() - self._construido_em > ttl and not self._renovando:
+            self._renovando = True
+            threading.Thread(target=self._renovar, daemon=True).start()
+
+    def _renovar(self):
+        try:
+            self.carregar()
+        finally:
+            self._renovando = False
+            connections.close_all()
+
+    def adicionar(self, tipo, pk, texto, termos_doc):
+        """Insere ou atualiza um documento."""
+        with self._lock:
+            self._adicionar(tipo, pk, texto, termos_doc)
+            for diario in self._diarios:
+                diario.append((self._adicionar, (tipo, pk, texto, termos_doc)))
+
+    def remover(self, tipo, pk):
+        """Remove um documento, se indexado."""
+        with self._lock:
+            self._remover(tipo, pk)
+            for diario in self._diarios:
+                diario.append((self._remover, (tipo, pk)))
+
+    def _adicionar(self, tipo, pk, texto, termos_doc):
+        self._remover(tipo, pk)
+        self._documentos[(tipo, pk)] = (texto, termos_doc)
+        for termo in termos_doc:
+            bisect.insort(self._termos[tipo], (termo, pk))
+
+    def _remover(self, tipo, pk):
+        documento = self._documentos.pop((tipo, pk), None)
+        if documento is None:
+            return
+        lista = self._termos[tipo]
+        for termo in documento[1]:
+            posicao = bisect.bisect_left(lista, (termo, pk))
+            if posicao < len(lista) and lista[posicao] == (termo, pk):
+                del lista[posicao]
+
+    def atualizar_se_carregado(self, tipo, pk, texto, termos_doc):
+        """Usado pelos sinais: só mexe no índice se ele já foi montado ou está sendo montado."""
+        with self._lock:
+            if self._construido_em is not None or self._diarios:
+                self.adicionar(tipo, pk, texto, termos_doc)
+
+    def _quantidade(self, prefixo, tipos):
+        """Quantos termos começam com `prefixo` (duas buscas binárias por tipo)."""
+        total = 0
+        for tipo in tipos:
+            lista = self._termos[tipo]
+            total += bisect.bisect_left(lista, (prefixo + '\uffff',)) - bisect.bisect_left(lista, (prefixo,))
+        return total
+
+    def _prefixados(self, tipo, prefixo):
+        """Percorre em ordem alfabética os (termo, tipo, pk) que começam com `prefixo`."""
+        lista = self._termos[tipo]
+        posicao = bisect.bisect_left(lista, (prefixo,))
+        while posicao < len(lista) and lista[posicao][0].startswith(prefixo):
+            termo, pk = lista[posicao]
+            yield termo, tipo, pk
+            posicao += 1
+
+    def buscar(self, consulta, tipos=TIPOS, limite=10):
+        """Devolve até `limite` documentos cujos termos começam com cada palavra da consulta.
+
+        Os resultados seguem a ordem alfabética do termo encontrado (o termo
+        idêntico à consulta vem primeiro), então a busca para assim que junta
+        `limite` documentos, sem percorrer todos os candidatos.
+        """
+        palavras = termos(consulta)
+        if not palavras:
+            return []
+        self._garantir_atualizado()
+        tipos = [t for t in TIPOS if t in tipos]
+
+        resultados = []
+        vistos = set()
+        with self._lock:
+            # Percorre a palavra com menos candidatos e filtra pelas demais.
+            principal = min(palavras, key=lambda p: self._quantidade(p, tipos))
+            outras = [p for p in palavras if p != principal]
+            candidatos = heapq.merge(*(self._prefixados(t, principal) for t in tipos))
+            for _, tipo, pk in candidatos:
+                if (tipo, pk) in vistos:
+                    continue
+                vistos.add((tipo, pk))
+                texto, termos_doc = self._documentos[(tipo, pk)]
+                if all(any(t.startswith(p) for t in termos_doc) for p in outras):
+                    resultados.append({'tipo': tipo, 'id': pk, 'texto': texto})
+                    if len(resultados) == limite:
+                        break
+        return resultados
+
+
+_indices = {}
+_lock_indices = threading.Lock()
+
+
+def indice_do_campus(codigo=None):
+    """Índice de busca do campus (o do contexto atual se `codigo` for None)."""
+    codigo = codigo or campus_atual()
+    with _lock_indices:
+        if codigo not in _indices:
+            _indices[codigo] = IndiceBusca(codigo)
+        return _indices[codigo]
+
+
+def indices_carregados():
+    """Todos os índices já criados no processo (um por campus consultado)."""
+    with _lock_indices:
+        return list(_indices.values())
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.hashers import make_password
-from .models import Usuario, Disciplina, Sala, Reserva
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import Usuario, Disciplina, Sala, Reserva, ReservaRecorrente, ExclusaoEmLote, Tarefa
+from . import recurrence
 
 
 class LoginSerializer(TokenObtainPairSerializer):
@@ -13,6 +16,13 @@ class LoginSerializer(TokenObtainPairSerializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
+    @classmethod
+    def get_token(cls, user):
+        """Inclui o tipo do usuário no token (usado pelo rate limit sem ir ao banco)."""
+        token = super().get_token(user)
+        token['tipo'] = user.tipo
+        return token
+
     def validate(self, attrs):
         """Valida as credenciais e adiciona informações do usuário ao response."""
         # Chama o validador do TokenObtainPairSerializer para autenticar
@@ -47,6 +57,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'password': {'write_only': True},  # Senha não é retornada no response
             'tipo': {'required': True},  # Tipo é obrigatório
+            'exclusao_pendente': {'read_only': True},  # Controlado pela exclusão em lote
         }
 
     def validate_tipo(self, value):
@@ -57,8 +68,13 @@ class UsuarioSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        """Cria um novo usuário com a senha hasheada."""
-        validated_data['password'] = make_password(validated_data['password'])
+        """Cria um novo usuário com a senha hasheada.
+
+        Com `senha_com_hash` no contexto a senha já chega como hash (criação em
+        lote pela fila, ver UsuarioLoteCreateView) e é gravada como está.
+        """
+        if not self.context.get('senha_com_hash'):
+            validated_data['password'] = make_password(validated_data['password'])
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
@@ -77,6 +93,7 @@ class SalasSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sala
         fields = '__all__'  # Inclui todos os campos do modelo
+        read_only_fields = ['exclusao_pendente']  # Controlado pela exclusão em lote
 
 
 class DisciplinaSerializer(serializers.ModelSerializer):
@@ -100,11 +117,33 @@ class DisciplinaSerializer(serializers.ModelSerializer):
         return value
 
 
-class ReservaSerializer(serializers.ModelSerializer):
+class ConflitosAoSalvarMixin:
+    """Devolve 400 para os conflitos de horário verificados no save() do modelo.
+
+    A checagem (verificar_conflitos) roda uma única vez, no save(); aqui o
+    ValidationError do Django vira um erro de validação do DRF.
+    """
+
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as erro:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: erro.messages})
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as erro:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: erro.messages})
+
+
+class ReservaSerializer(ConflitosAoSalvarMixin, serializers.ModelSerializer):
     """Serializer para o modelo Reserva.
 
     Gerencia a serialização/deserialização de reservas, com validação para
-    garantir que a data de início seja anterior à data de término.
+    garantir que a data de início seja anterior à data de término. Conflitos
+    com outras reservas e regras recorrentes da sala são verificados no save()
+    e respondidos com 400.
     """
     class Meta:
         model = Reserva
@@ -120,4 +159,56 @@ class ReservaSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "A data de início deve ser anterior à data de término."
             )
-        return data
\ No newline at end of file
+        return data
+
+
+class DiasSemanaField(serializers.Field):
+    """Expõe a máscara `dias_semana` como lista de dias (0 = segunda ... 6 = domingo)."""
+
+    def to_representation(self, value):
+        return recurrence.dias(value)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data or any(
+            not isinstance(dia, int) or not 0 <= dia <= 6 for dia in data
+        ):
+            raise serializers.ValidationError("Informe uma lista de dias entre 0 (segunda) e 6 (domingo).")
+        return recurrence.mascara(data)
+
+
+class ReservaRecorrenteSerializer(ConflitosAoSalvarMixin, serializers.ModelSerializer):
+    """Serializer para o modelo ReservaRecorrente.
+
+    Recebe os dias da semana como lista e as exceções como datas. Horários,
+    datas e conflitos com outras regras e reservas da sala são verificados no
+    save() do modelo e respondidos com 400.
+    """
+    dias_semana = DiasSemanaField()
+    excecoes = serializers.ListField(child=serializers.DateField(), required=False)
+
+    class Meta:
+        model = ReservaRecorrente
+        fields = '__all__'  # Inclui todos os campos do modelo
+
+    def validate_excecoes(self, value):
+        """Guarda as exceções como datas ISO ordenadas e sem repetição."""
+        return sorted({dia.isoformat() for dia in value})
+
+
+class ExclusaoEmLoteSerializer(serializers.ModelSerializer):
+    """Serializer (somente leitura) do progresso de uma exclusão em lote."""
+    class Meta:
+        model = ExclusaoEmLote
+        fields = '__all__'  # Inclui todos os campos do modelo
+        read_only_fields = [f.name for f in ExclusaoEmLote._meta.fields]
+
+
+class TarefaSerializer(serializers.ModelSerializer):
+    """Serializer (somente leitura) da situação de uma tarefa da fila.
+
+    Os argumentos não são expostos: podem conter dados sensíveis (senhas).
+    """
+    class Meta:
+        model = Tarefa
+        exclude = ['argumentos']
+        read_only_fields = [f.name for f in Tarefa._meta.fields if f.name != 'argumentos']
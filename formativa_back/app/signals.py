@@ -0,0 +1,119 @@
+"""
+Receptores de sinais dos modelos do app.
+
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Usuario, Sala, Disciplina, Reserva, ReservaRecorrente
+from .authentication import desmarcar_desativado, marcar_desativado
+from .availability import agendar_atualizacao
+from .events import hub_reservas
+from .search import (
+    indice_do_campus, indices_carregados, documento_usuario, documento_sala, documento_disciplina,
+    USUARIO, SALA, DISCIPLINA,
+)
+from .routers import campus_do_alias
+
+_DOCUMENTOS_BUSCA = {
+    Usuario: (USUARIO, documento_usuario),
+    Sala: (SALA, documento_sala),
+    Disciplina: (DISCIPLINA, documento_disciplina),
+}
+
+
+@receiver(post_save, sender=Reserva)
+def publicar_reserva_salva(sender, instance, created, using, **kwargs):
+    """Publica no hub SSE a criação ou atualização de uma reserva."""
+    from .serializers import ReservaSerializer
+
+    tipo = 'reserva_criada' if created else 'reserva_atualizada'
+    dados = dict(ReservaSerializer(instance).data)
+    professor_id = instance.professor_id
+    campus = campus_do_alias(using)
+    transaction.on_commit(lambda: hub_reservas.publicar(tipo, dados, professor_id, campus), using=using)
+
+
+@receiver(post_delete, sender=Reserva)
+def publicar_reserva_excluida(sender, instance, using, **kwargs):
+    """Publica no hub SSE a exclusão de uma reserva."""
+    dados = {'id': instance.pk}
+    professor_id = instance.professor_id
+    campus = campus_do_alias(using)
+    transaction.on_commit(
+        lambda: hub_reservas.publicar('reserva_excluida', dados, professor_id, campus), using=using
+    )
+
+
+def _indices_afetados(sender, using):
+    """Usuários aparecem em todos os índices; salas e disciplinas só no do seu campus."""
+    if sender is Usuario:
+        return indices_carregados()
+    return [indice_do_campus(campus_do_alias(using))]
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=Sala)
+@receiver(post_save, sender=Disciplina)
+def indexar_para_busca(sender, instance, using, **kwargs):
+    """Mantém o índice de busca (typeahead) atualizado após salvar."""
+    tipo, documento = _DOCUMENTOS_BUSCA[sender]
+    pk = instance.pk
+    indices = _indices_afetados(sender, using)
+    if getattr(instance, 'exclusao_pendente', False):
+        transaction.on_commit(lambda: [indice.remover(tipo, pk) for indice in indices], using=using)
+        return
+    texto, termos = documento(instance)
+    transaction.on_commit(
+        lambda: [indice.atualizar_se_carregado(tipo, pk, texto, termos) for indice in indices], using=using
+    )
+
+
+@receiver(post_save, sender=Usuario)
+def marcar_usuario_desativado(sender, instance, using, **kwargs):
+    """Recusa os tokens emitidos de um usuário desativado nas rotas sem consulta ao banco."""
+    usuario_id = instance.pk
+    if instance.is_active:
+        transaction.on_commit(lambda: desmarcar_desativado(usuario_id), using=using)
+    else:
+        transaction.on_commit(lambda: marcar_desativado(usuario_id), using=using)
+
+
+@receiver(post_delete, sender=Usuario)
+@receiver(post_delete, sender=Sala)
+@receiver(post_delete, sender=Disciplina)
+def remover_da_busca(sender, instance, using, **kwargs):
+    """Remove do índice de busca os objetos excluídos."""
+    tipo = _DOCUMENTOS_BUSCA[sender][0]
+    pk = instance.pk
+    indices = _indices_afetados(sender, using)
+    transaction.on_commit(lambda: [indice.remover(tipo, pk) for indice in indices], using=using)
+
+
+@receiver(post_init, sender=Reserva)
+@receiver(post_init, sender=ReservaRecorrente)
+def guardar_sala_original(sender, instance, **kwargs):
+    """Guarda a sala carregada para saber, ao salvar, se a reserva mudou de sala."""
+    # Pelo __dict__: com only()/defer() o campo pode não ter sido carregado.
+    instance._sala_original_id = instance.__dict__.get('sala_reservada_id')
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+@receiver(post_save, sender=ReservaRecorrente)
+@receiver(post_delete, sender=ReservaRecorrente)
+def atualizar_disponibilidade(sender, instance, using, **kwargs):
+    """Recalcula no snapshot de disponibilidade a sala da reserva após o commit.
+
+    Se a reserva mudou de sala, a sala anterior também é recalculada.
+    """
+    agendar_atualizacao([instance.sala_reservada_id, instance._sala_original_id], using)
+    instance._sala_original_id = instance.sala_reservada_id
+
+
+@receiver(post_save, sender=Sala)
+@receiver(post_delete, sender=Sala)
+def atualizar_disponibilidade_da_sala(sender, instance, using, **kwargs):
+    """Inclui salas novas no snapshot de disponibilidade e tira as excluídas."""
+    agendar_atualizacao([instance.pk], using)
@@ -0,0 +1,45 @@
+"""
+Tarefas executadas pela fila do banco (app/jobs.py).
+
+Importado em AppConfig.ready() para que o registro fique completo tanto no
+servidor (que enfileira) quanto nos processos do worker (que executam).
+
+"""
+
+from django.db import transaction
+
+from .deletion import processar_exclusao
+from .jobs import tarefa
+from .models import ExclusaoEmLote
+
+
+@tarefa('exclusao_em_lote', prioridade=10)
+def exclusao_em_lote(exclusao_id):
+    """Remove em lotes os dependentes de um usuário ou sala (ver app/deletion.py)."""
+    exclusao = processar_exclusao(exclusao_id)
+    if exclusao is None:
+        status = ExclusaoEmLote.objects.filter(pk=exclusao_id).values_list('status', flat=True).first()
+        if status in (None, 'CONCLUIDA'):
+            return None
+        # Outro executor ainda a processa (ex.: processar_exclusoes) ou caiu há
+        # pouco: falha para a fila tentar de novo em vez de dar a tarefa por concluída.
+        raise RuntimeError(f'Exclusão {exclusao_id} em execução por outro executor.')
+    if exclusao.status == 'ERRO':
+        # A exclusão continua de onde parou na próxima tentativa da tarefa.
+        raise RuntimeError(exclusao.erro)
+    return {'exclusao': exclusao.pk, 'removidos': exclusao.removidos}
+
+
+@tarefa('criar_usuarios', max_tentativas=1, sensivel=True)
+def criar_usuarios(usuarios):
+    """Cria usuários em lote; as senhas já chegam como hash (ver UsuarioLoteCreateView).
+
+    Roda numa única transação: se algum usuário for inválido nenhum é criado.
+    """
+    from .serializers import UsuarioSerializer
+
+    serializer = UsuarioSerializer(data=usuarios, many=True, context={'senha_com_hash': True})
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        criados = serializer.save()
+    return {'criados': len(criados), 'ids': [usuario.pk for usuario in criados]}
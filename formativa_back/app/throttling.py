@@ -0,0 +1,207 @@
+"""
+Limite de requisições por usuário, papel e rota com token buckets.
+
+Cada balde tem uma capacidade (rajada máxima) e uma taxa de reposição em
+tokens por segundo. Os baldes ficam em memória no processo ou, para dividir o
+limite entre vários workers, num arquivo SQLite local (RATE_LIMIT['ARMAZEM']).
+
+O middleware roda antes das views e identifica o usuário apenas pelas claims
+do JWT (assinatura e validade), sem consultar o banco: um cliente em loop é
+barrado sem gerar nenhuma query.
+
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+ROTA_AUTH = 'token_obtain_pair'
+# O EventSource do navegador não envia headers: o stream recebe o token em ?token=.
+ROTA_STREAM = 'reserva-stream'
+
+
+def _repor(tokens, atualizado, agora, capacidade, taxa):
+    return min(capacidade, tokens + (agora - atualizado) * taxa)
+
+
+def _espera(permitido, tokens, custo, taxa):
+    """Segundos até o balde ter `custo` tokens; infinito se ele não é reposto (taxa 0)."""
+    if permitido:
+        return 0
+    return (custo - tokens) / taxa if taxa > 0 else math.inf
+
+
+class ArmazemMemoria:
+    """Baldes em um dicionário do processo, limitado às chaves mais recentes."""
+
+    def __init__(self, max_chaves=100_000):
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_chaves = max_chaves
+
+    def consumir(self, chave, capacidade, taxa, custo=1):
+        """Tira `custo` tokens do balde; devolve (permitido, segundos de espera)."""
+        agora = time.monotonic()
+        with self._lock:
+            tokens, atualizado = self._baldes.pop(chave, (capacidade, agora))
+            tokens = _repor(tokens, atualizado, agora, capacidade, taxa)
+            permitido = tokens >= custo
+            if permitido:
+                tokens -= custo
+            self._baldes[chave] = (tokens, agora)
+            if len(self._baldes) > self._max_chaves:
+                self._baldes.popitem(last=False)
+        return permitido, _espera(permitido, tokens, custo, taxa)
+
+
+class ArmazemSQLite:
+    """Baldes num arquivo SQLite local, compartilhados por todos os workers da máquina."""
+
+    def __init__(self, caminho):
+        self._caminho = str(caminho)
+        self._local = threading.local()
+        with self._conexao() as conexao:
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS baldes ('
+                'chave TEXT PRIMARY KEY, tokens REAL NOT NULL, atualizado REAL NOT NULL)'
+            )
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self._caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=OFF')
+            self._local.conexao = conexao
+        return conexao
+
+    def consumir(self, chave, capacidade, taxa, custo=1):
+        """Tira `custo` tokens do balde; devolve (permitido, segundos de espera)."""
+        agora = time.time()
+        conexao = self._conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            linha = conexao.execute('SELECT tokens, atualizado FROM baldes WHERE chave = ?', (chave,)).fetchone()
+            tokens = _repor(*linha, agora, capacidade, taxa) if linha else capacidade
+            permitido = tokens >= custo
+            if permitido:
+                tokens -= custo
+            conexao.execute(
+                'INSERT OR REPLACE INTO baldes (chave, tokens, atualizado) VALUES (?, ?, ?)',
+                (chave, tokens, agora),
+            )
+            conexao.execute('COMMIT')
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+        return permitido, _espera(permitido, tokens, custo, taxa)
+
+
+def criar_armazem(configuracao):
+    armazem = configuracao.get('ARMAZEM', 'memoria')
+    if armazem == 'memoria':
+        return ArmazemMemoria()
+    return ArmazemSQLite(armazem)
+
+
+def claims_do_token(request, aceitar_consulta=False):
+    """Lê user_id e tipo do JWT sem consultar o banco (None se ausente ou inválido).
+
+    Com `aceitar_consulta`, sem o header Authorization vale o token em ?token=
+    (como na autenticação do stream SSE).
+    """
+    autenticacao = JWTAuthentication()
+    header = autenticacao.get_header(request)
+    raw_token = autenticacao.get_raw_token(header) if header else None
+    if raw_token is None and aceitar_consulta:
+        raw_token = request.GET.get('token') or None
+    if raw_token is None:
+        return None
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM), token.get('tipo', 'PROFESSOR')
+
+
+def ip_do_cliente(request, proxies=0):
+    """IP do cliente atrás de `proxies` proxies reversos confiáveis.
+
+    Cada proxy acrescenta ao X-Forwarded-For o endereço de quem o chamou; só os
+    últimos `proxies` itens foram escritos por proxies confiáveis. Sem proxies,
+    ou sem o header, vale o REMOTE_ADDR.
+    """
+    remoto = request.META.get('REMOTE_ADDR', '')
+    if not proxies:
+        return remoto
+    encaminhados = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if not encaminhados:
+        return remoto
+    return encaminhados[-min(proxies, len(encaminhados))]
+
+
+class RateLimitMiddleware:
+    """Aplica os limites de RATE_LIMIT às rotas do app e responde 429 com Retry-After.
+
+    - auth/: balde por IP, separado, porque cada tentativa gera um hash de senha.
+    - demais rotas: balde por usuário com a capacidade do papel (GESTOR/PROFESSOR)
+      e, se a rota estiver em ROTAS, um balde extra por usuário e rota.
+    - requests sem token válido usam o balde ANONIMO por IP; no stream SSE o
+      token também é lido de ?token=, como na autenticação da view.
+
+    Atrás de proxy reverso o IP vem do X-Forwarded-For (RATE_LIMIT['PROXIES']);
+    sem isso todos os clientes dividiriam o balde do IP do proxy.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.configuracao = getattr(settings, 'RATE_LIMIT', {})
+        if not self.configuracao.get('ATIVO', True):
+            raise MiddlewareNotUsed
+        self.armazem = criar_armazem(self.configuracao)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        rota = request.resolver_match
+        if rota is None or rota.app_name != 'app':
+            return None
+        ip = ip_do_cliente(request, self.configuracao.get('PROXIES', 0))
+
+        if rota.url_name == ROTA_AUTH:
+            baldes = [(f'auth:{ip}', self.configuracao['AUTH'])]
+        else:
+            claims = claims_do_token(request, aceitar_consulta=rota.url_name == ROTA_STREAM)
+            if claims is None:
+                baldes = [(f'anonimo:{ip}', self.configuracao['PAPEIS']['ANONIMO'])]
+            else:
+                usuario_id, tipo = claims
+                papeis = self.configuracao['PAPEIS']
+                baldes = [(f'usuario:{usuario_id}', papeis.get(tipo, papeis['PROFESSOR']))]
+                if rota.url_name in self.configuracao.get('ROTAS', {}):
+                    baldes.append((f'rota:{rota.url_name}:{usuario_id}', self.configuracao['ROTAS'][rota.url_name]))
+
+        for chave, (capacidade, taxa) in baldes:
+            permitido, espera = self.armazem.consumir(chave, capacidade, taxa)
+            if not permitido:
+                if math.isinf(espera):
+                    return JsonResponse({'detail': 'Limite de requisições esgotado.'}, status=429)
+                segundos = max(1, math.ceil(espera))
+                response = JsonResponse(
+                    {'detail': f'Muitas requisições. Tente novamente em {segundos} segundos.'},
+                    status=429,
+                )
+                response['Retry-After'] = str(segundos)
+                return response
+        return None
@@ -4,9 +4,12 @@ from .views import (
     SalaListCreateAPIView,
     SalaPorProfessorListView,
     SalaRetrieveUpdateDestroyView,
+    SalaDisponibilidadeView,
+    SalasLivresView,
     UsuarioListCreateView,
     UsuarioRetrieveUpdateDestroyView,
     UsuarioProfessorView,
+    UsuarioLoteCreateView,
     DisciplinaListCreateView,
     DisciplinaRetrieveUpdateDestroyView,
     DisciplinaPorProfessorListView,
@@ -15,6 +18,15 @@ from .views import (
     ReservaPorProfessorListView,
     LoginView,
     getPeriodoData,
+    reservas_stream,
+    BuscaView,
+    ReservaRecorrenteListCreateView,
+    ReservaRecorrenteRetrieveUpdateDestroyView,
+    ReservaRecorrenteOcorrenciasView,
+    CalendarioView,
+    ExclusaoEmLoteRetrieveView,
+    TarefaListView,
+    TarefaRetrieveView,
 
 )
 
@@ -25,9 +37,12 @@ urlpatterns = [
     path('salas/', SalaListCreateAPIView.as_view(), name='salas-list-create'),
     path('salas/<int:pk>', SalaRetrieveUpdateDestroyView.as_view(), name='salas-list-create'),
     path('salas/professores/<int:ni>/', SalaPorProfessorListView.as_view(), name='salas-list-create'),
+    path('salas/livres/', SalasLivresView.as_view(), name='salas-livres'),
+    path('salas/<int:pk>/disponibilidade/', SalaDisponibilidadeView.as_view(), name='sala-disponibilidade'),
 
     # Usuários
     path('usuarios/', UsuarioListCreateView.as_view(), name='usuario-list-create'),
+    path('usuarios/lote/', UsuarioLoteCreateView.as_view(), name='usuario-lote'),
     path('usuarios/professores/', UsuarioProfessorView.as_view(), name='usuario-professor-list'),
     path('usuarios/<int:pk>/', UsuarioRetrieveUpdateDestroyView.as_view(), name='usuario-detail'),
 
@@ -40,10 +55,27 @@ urlpatterns = [
     path('reservas/', ReservaListCreateView.as_view(), name='reserva-list-create'),
     path('reservas/<int:pk>/', ReservaRetrieveDestroyAPIView.as_view(), name='reserva-destroy'),
     path('reservas/professores/<int:ni>/', ReservaPorProfessorListView.as_view(), name='reserva-list-professor'),
+    path('reservas/stream/', reservas_stream, name='reserva-stream'),
+    path('reservas/calendario/', CalendarioView.as_view(), name='reserva-calendario'),
+
+    # Reservas recorrentes
+    path('reservas/recorrentes/', ReservaRecorrenteListCreateView.as_view(), name='reserva-recorrente-list-create'),
+    path('reservas/recorrentes/<int:pk>/', ReservaRecorrenteRetrieveUpdateDestroyView.as_view(), name='reserva-recorrente-detail'),
+    path('reservas/recorrentes/<int:pk>/ocorrencias/', ReservaRecorrenteOcorrenciasView.as_view(), name='reserva-recorrente-ocorrencias'),
     
     # JWT
     path('auth/', LoginView.as_view(), name='token_obtain_pair'),
 
+    # Exclusões em lote
+    path('exclusoes/<int:pk>/', ExclusaoEmLoteRetrieveView.as_view(), name='exclusao-detail'),
+
+    # Fila de tarefas
+    path('tarefas/', TarefaListView.as_view(), name='tarefa-list'),
+    path('tarefas/<int:pk>/', TarefaRetrieveView.as_view(), name='tarefa-detail'),
+
+    # Busca (typeahead)
+    path('busca/', BuscaView.as_view(), name='busca'),
+
     # Data extra
     path('periodos/', view=getPeriodoData, name='get_periodo_data')
 ]
\ No newline at end of file
@@ -1,10 +1,36 @@
+from django.contrib.auth.hashers import make_password
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, ListAPIView
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.generics import RetrieveAPIView
+from rest_framework import status
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import Usuario, Disciplina, Sala, Reserva
-from .serializers import UsuarioSerializer, DisciplinaSerializer, SalasSerializer, ReservaSerializer, LoginSerializer
+from rest_framework.exceptions import ValidationError
+from .models import Usuario, Disciplina, Sala, Reserva, ReservaRecorrente, ExclusaoEmLote, Tarefa
+from .serializers import (
+    UsuarioSerializer, DisciplinaSerializer, SalasSerializer, ReservaSerializer, LoginSerializer,
+    ReservaRecorrenteSerializer, ExclusaoEmLoteSerializer, TarefaSerializer,
+)
+from .authentication import JWTAtivoStatelessAuthentication
+from .deletion import agendar_exclusao
+from .tasks import criar_usuarios
 from .permissions import IsGestor, IsProfessorOrGestor, IsProfessor
-from django.http import JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+from datetime import datetime, time, timedelta
+import heapq
+import json
 from .constants import PERIODO_CHOICES
+from .events import hub_reservas
+from .search import indice_do_campus, TIPOS, USUARIO
+from .availability import snapshot_do_campus, faixas, intervalos, ForaDaJanela, SnapshotIndisponivel
 
 class LoginView(TokenObtainPairView):
     """View para autenticação de usuários com JWT.
@@ -22,26 +48,65 @@ class UsuarioListCreateView(ListCreateAPIView):
     Métodos HTTP suportados: GET (listar), POST (criar)
     Permissões: Apenas gestores (IsGestor)
     """
-    queryset = Usuario.objects.all()
+    # groups e user_permissions entram no serializer ('__all__'): sem o prefetch
+    # seriam duas queries por usuário listado.
+    queryset = Usuario.objects.filter(exclusao_pendente=False).prefetch_related('groups', 'user_permissions')
     serializer_class = UsuarioSerializer
     permission_classes = [IsGestor]
 
 
-class UsuarioRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+class ExclusaoEmLoteMixin:
+    """DELETE marca o objeto e agenda a remoção dos dependentes em lotes.
+
+    Responde 202 com o acompanhamento da exclusão (ver ExclusaoEmLoteRetrieveView)
+    em vez de apagar toda a cascata dentro do request.
+    """
+
+    def destroy(self, request, *args, **kwargs):
+        exclusao = agendar_exclusao(self.get_object(), solicitado_por=request.user)
+        return Response(ExclusaoEmLoteSerializer(exclusao).data, status=status.HTTP_202_ACCEPTED)
+
+
+class UsuarioRetrieveUpdateDestroyView(ExclusaoEmLoteMixin, RetrieveUpdateDestroyAPIView):
     """View para visualizar, atualizar ou excluir um usuário específico.
 
     Permite que gestores visualizem, atualizem (total ou parcialmente) ou excluam
-    um usuário com base no ID (pk).
+    um usuário com base no ID (pk). A exclusão é feita em segundo plano (202).
     Métodos HTTP suportados: GET (visualizar), PUT (atualizar), PATCH (atualização parcial), DELETE (excluir)
     Permissões: Apenas gestores (IsGestor)
     """
-    queryset = Usuario.objects.all()
+    # groups e user_permissions entram no serializer ('__all__'): sem o prefetch
+    # seriam duas queries por usuário listado.
+    queryset = Usuario.objects.filter(exclusao_pendente=False).prefetch_related('groups', 'user_permissions')
     serializer_class = UsuarioSerializer
     permission_classes = [IsGestor]
     lookup_field = 'pk'
 
+class UsuarioLoteCreateView(APIView):
+    """View para criar usuários em lote pela fila de tarefas.
+
+    Recebe uma lista de usuários, valida os dados no request e enfileira a
+    criação. As senhas são convertidas em hash aqui, antes de irem para a
+    tabela de tarefas: nenhuma senha legível é gravada no banco (nem nas
+    réplicas). Responde 202 com a tarefa, que o front acompanha em
+    tarefas/<id>/.
+    Métodos HTTP suportados: POST (criar)
+    Permissões: Apenas gestores (IsGestor)
+    """
+    permission_classes = [IsGestor]
+
+    def post(self, request):
+        serializer = UsuarioSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        usuarios = [dict(usuario, password=make_password(usuario['password'])) for usuario in request.data]
+        tarefa = criar_usuarios.enfileirar(args=[usuarios], solicitado_por=request.user)
+        return Response(TarefaSerializer(tarefa).data, status=status.HTTP_202_ACCEPTED)
+
+
 class UsuarioProfessorView(ListAPIView):
-    queryset = Usuario.objects.filter(tipo = 'PROFESSOR')
+    queryset = Usuario.objects.filter(
+        tipo='PROFESSOR', exclusao_pendente=False
+    ).prefetch_related('groups', 'user_permissions')
     serializer_class = UsuarioSerializer
     permission_classes = [IsGestor]
 
@@ -96,7 +161,7 @@ class SalaListCreateAPIView(ListCreateAPIView):
     Métodos HTTP suportados: GET (listar), POST (criar)
     Permissões: Professores ou gestores (IsProfessorOrGestor)
     """
-    queryset = Sala.objects.all()
+    queryset = Sala.objects.filter(exclusao_pendente=False)
     serializer_class = SalasSerializer
 
     def get_permissions(self):
@@ -107,15 +172,15 @@ class SalaListCreateAPIView(ListCreateAPIView):
         return super().get_permissions()
 
 
-class SalaRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+class SalaRetrieveUpdateDestroyView(ExclusaoEmLoteMixin, RetrieveUpdateDestroyAPIView):
     """View para visualizar, atualizar ou excluir uma sala específica.
 
     Permite que gestores visualizem, atualizem (total ou parcialmente) ou excluam
-    uma sala com base no ID (pk).
+    uma sala com base no ID (pk). A exclusão é feita em segundo plano (202).
     Métodos HTTP suportados: GET (visualizar), PUT (atualizar), PATCH (atualização parcial), DELETE (excluir)
     Permissões: Apenas gestores (IsGestor)
     """
-    queryset = Sala.objects.all()
+    queryset = Sala.objects.filter(exclusao_pendente=False)
     serializer_class = SalasSerializer
     permission_classes = [IsGestor]
     lookup_field = 'pk'
@@ -135,7 +200,7 @@ class SalaPorProfessorListView(ListAPIView):
 
     def get_queryset(self):
         """Retorna as disciplinas associadas ao professor logado."""
-        return Sala.objects.filter(professor=self.request.user)
+        return Sala.objects.filter(professor=self.request.user, exclusao_pendente=False)
 
 
 class ReservaListCreateView(ListCreateAPIView):
@@ -187,13 +252,365 @@ class ReservaPorProfessorListView(ListAPIView):
 
     def get_queryset(self):
         """Retorna as reservas associadas ao professor logado."""
-        return Reserva.objects.filter(professor_responsavel=self.request.user)
+        return Reserva.objects.filter(professor=self.request.user)
     
 
+class ReservaRecorrenteListCreateView(ListCreateAPIView):
+    """View para listar e criar reservas recorrentes (regras semanais).
+
+    Permite que professores ou gestores listem as regras; apenas gestores criam.
+    Suporta filtragem por professor_id via query parameter.
+    Métodos HTTP suportados: GET (listar), POST (criar)
+    Permissões: Professores ou gestores (GET) e gestores (POST)
+    """
+    queryset = ReservaRecorrente.objects.all()
+    serializer_class = ReservaRecorrenteSerializer
+
+    def get_permissions(self):
+        if self.request.method == 'GET':
+            self.permission_classes = [IsProfessorOrGestor]
+        else:
+            self.permission_classes = [IsGestor]
+        return super().get_permissions()
+
+    def get_queryset(self):
+        """Filtra regras por professor_id, se fornecido nos query parameters."""
+        queryset = super().get_queryset()
+        professor_id = self.request.query_params.get('Professor', None)
+        if professor_id:
+            queryset = queryset.filter(professor_id=professor_id)
+        return queryset
+
+
+class ReservaRecorrenteRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+    """View para visualizar, atualizar ou excluir uma reserva recorrente.
+
+    Permite que gestores ou o professor dono da regra a visualizem, atualizem
+    (por exemplo, adicionando exceções) ou excluam.
+    Métodos HTTP suportados: GET (visualizar), PUT (atualizar), PATCH (atualização parcial), DELETE (excluir)
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+    queryset = ReservaRecorrente.objects.all()
+    serializer_class = ReservaRecorrenteSerializer
+    permission_classes = [IsProfessorOrGestor]
+    lookup_field = 'pk'
+
+
+def _janela(request):
+    """Lê ?inicio= e ?fim= (data ou data/hora) e limita a janela a JANELA_MAXIMA_DIAS."""
+    limites = []
+    for nome in ('inicio', 'fim'):
+        valor = request.query_params.get(nome, '')
+        momento = parse_datetime(valor)
+        if momento is None:
+            dia = parse_date(valor)
+            if dia is None:
+                raise ValidationError({nome: 'Informe uma data (AAAA-MM-DD) ou data/hora ISO.'})
+            momento = datetime.combine(dia + timedelta(days=1 if nome == 'fim' else 0), time.min)
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+        limites.append(momento)
+    inicio, fim = limites
+    if fim <= inicio:
+        raise ValidationError({'fim': 'O fim da janela deve ser posterior ao início.'})
+    if fim - inicio > timedelta(days=getattr(settings, 'JANELA_MAXIMA_DIAS', 366)):
+        raise ValidationError({'fim': 'Janela de datas longa demais.'})
+    return inicio, fim
+
+
+def _ocorrencias_da_regra(regra, inicio, fim):
+    """Gera os itens de calendário de uma regra, só dentro da janela."""
+    for ocorrencia_inicio, ocorrencia_fim in regra.ocorrencias(inicio, fim):
+        yield {
+            'tipo': 'recorrente',
+            'id': regra.pk,
+            'sala_reservada': regra.sala_reservada_id,
+            'professor': regra.professor_id,
+            'disciplina': regra.disciplina_id,
+            'periodo': regra.periodo,
+            'data_inicio': ocorrencia_inicio,
+            'data_termino': ocorrencia_fim,
+        }
+
+
+class ReservaRecorrenteOcorrenciasView(APIView):
+    """View para listar as ocorrências de uma reserva recorrente numa janela.
+
+    Parâmetros: inicio e fim (obrigatórios).
+    Métodos HTTP suportados: GET
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+    permission_classes = [IsProfessorOrGestor]
+
+    def get(self, request, pk):
+        regra = get_object_or_404(ReservaRecorrente, pk=pk)
+        self.check_object_permissions(request, regra)
+        inicio, fim = _janela(request)
+        return Response(list(_ocorrencias_da_regra(regra, inicio, fim)))
+
+
+class CalendarioView(APIView):
+    """View de calendário com reservas avulsas e ocorrências das recorrentes.
+
+    As ocorrências são geradas apenas para a janela pedida e intercaladas com
+    as reservas avulsas por data de início.
+    Parâmetros: inicio e fim (obrigatórios), sala e Professor (opcionais).
+    Métodos HTTP suportados: GET
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+    permission_classes = [IsProfessorOrGestor]
+
+    def get(self, request):
+        inicio, fim = _janela(request)
+        avulsas = Reserva.objects.filter(data_inicio__lt=fim, data_termino__gt=inicio)
+        regras = ReservaRecorrente.objects.filter(
+            data_inicio__lte=timezone.localtime(fim).date(),
+            data_fim__gte=timezone.localtime(inicio).date(),
+        )
+        for parametro, campo in (('sala', 'sala_reservada_id'), ('Professor', 'professor_id')):
+            valor = request.query_params.get(parametro)
+            if valor:
+                avulsas = avulsas.filter(**{campo: valor})
+                regras = regras.filter(**{campo: valor})
+
+        itens_avulsos = (
+            {'tipo': 'reserva', 'id': r['id'], 'sala_reservada': r['sala_reservada_id'],
+             'professor': r['professor_id'], 'disciplina': r['disciplina_id'],
+             'periodo': r['periodo'], 'data_inicio': r['data_inicio'], 'data_termino': r['data_termino']}
+            for r in avulsas.order_by('data_inicio').values(
+                'id', 'sala_reservada_id', 'professor_id', 'disciplina_id',
+                'periodo', 'data_inicio', 'data_termino',
+            ).iterator()
+        )
+        fontes = [itens_avulsos] + [_ocorrencias_da_regra(regra, inicio, fim) for regra in regras]
+        return Response(list(heapq.merge(*fontes, key=lambda item: item['data_inicio'])))
+
+
+class ExclusaoEmLoteRetrieveView(RetrieveAPIView):
+    """View para acompanhar o progresso de uma exclusão em lote.
+
+    O front pode consultar periodicamente até o status ser CONCLUIDA ou ERRO.
+    Métodos HTTP suportados: GET (visualizar)
+    Permissões: Apenas gestores (IsGestor)
+    """
+    queryset = ExclusaoEmLote.objects.all()
+    serializer_class = ExclusaoEmLoteSerializer
+    permission_classes = [IsGestor]
+    lookup_field = 'pk'
+
+
+class TarefaListView(ListAPIView):
+    """View para listar as tarefas da fila, das mais recentes para as mais antigas.
+
+    Gestores veem todas as tarefas; professores apenas as que solicitaram.
+    Métodos HTTP suportados: GET (listar)
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+    serializer_class = TarefaSerializer
+    permission_classes = [IsProfessorOrGestor]
+
+    def get_queryset(self):
+        queryset = Tarefa.objects.order_by('-criado_em')
+        if self.request.user.tipo != 'GESTOR':
+            queryset = queryset.filter(solicitado_por=self.request.user)
+        status_tarefa = self.request.query_params.get('status')
+        if status_tarefa:
+            queryset = queryset.filter(status=status_tarefa)
+        return queryset[:100]
+
+
+class TarefaRetrieveView(RetrieveAPIView):
+    """View para acompanhar uma tarefa da fila.
+
+    O front pode consultar periodicamente até o status ser CONCLUIDA ou ERRO;
+    `resultado` traz o valor devolvido pela tarefa.
+    Métodos HTTP suportados: GET (visualizar)
+    Permissões: Gestores ou o professor que solicitou (IsProfessorOrGestor)
+    """
+    serializer_class = TarefaSerializer
+    permission_classes = [IsProfessorOrGestor]
+    lookup_field = 'pk'
+
+    def get_queryset(self):
+        queryset = Tarefa.objects.all()
+        if self.request.user.tipo != 'GESTOR':
+            queryset = queryset.filter(solicitado_por=self.request.user)
+        return queryset
+
+
+class BuscaView(APIView):
+    """View de busca por prefixo (typeahead) em usuários, salas e disciplinas.
+
+    Usa o índice em memória de app/search.py, sem consultar o banco a cada tecla.
+    Parâmetros: q (texto), tipos (usuario,sala,disciplina) e limite (máx. 50).
+    Professores não recebem resultados de usuários.
+    Métodos HTTP suportados: GET
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+    permission_classes = [IsProfessorOrGestor]
+
+    def get(self, request):
+        tipos = [t for t in request.query_params.get('tipos', ','.join(TIPOS)).split(',') if t in TIPOS]
+        if request.user.tipo != 'GESTOR' and USUARIO in tipos:
+            tipos.remove(USUARIO)
+        try:
+            limite = min(max(int(request.query_params.get('limite', 10)), 1), 50)
+        except ValueError:
+            limite = 10
+        return Response(indice_do_campus().buscar(request.query_params.get('q', ''), tipos, limite))
+
+
+def _parametro(request, nome, conversor, formato, padrao=None):
+    """Lê um parâmetro de data (parse_date) ou horário (parse_time) da query string."""
+    valor = request.query_params.get(nome)
+    if not valor and padrao is not None:
+        return padrao
+    convertido = conversor(valor or '')
+    if convertido is None:
+        raise ValidationError({nome: f'Informe {formato}.'})
+    return convertido
+
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+class DisponibilidadeMixin:
+    """Leitura do snapshot de disponibilidade (app/availability.py), sem consultar o banco.
+
+    O token é validado sem carregar o usuário: o tipo vem do claim gravado no
+    login. Usuários desativados (exclusão em lote, app/deletion.py) são
+    recusados por uma marca no cache, sem consulta (ver app/authentication.py).
+    """
+    authentication_classes = [JWTAtivoStatelessAuthentication]
+    permission_classes = [IsProfessorOrGestor]
+
+    def ler_snapshot(self, leitura):
+        try:
+            return leitura(snapshot_do_campus())
+        except ForaDaJanela as erro:
+            raise ValidationError({'data': str(erro)})
+        except SnapshotIndisponivel as erro:
+            excecao = APIException(str(erro))
+            excecao.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            raise excecao
+
+
+class SalaDisponibilidadeView(DisponibilidadeMixin, APIView):
+    """View para consultar os horários ocupados de uma sala, dia a dia.
+
+    Parâmetros: inicio e fim (datas, opcionais; padrão: hoje). Cada dia traz
+    os intervalos ocupados em faixas de 30 minutos, somando reservas avulsas
+    e recorrentes.
+    Métodos HTTP suportados: GET
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+
+    def get(self, request, pk):
+        hoje = timezone.localdate()
+        inicio = _parametro(request, 'inicio', parse_date, 'uma data (AAAA-MM-DD)', hoje)
+        fim = _parametro(request, 'fim', parse_date, 'uma data (AAAA-MM-DD)', inicio)
+        geracao, dias = self.ler_snapshot(lambda snapshot: snapshot.ocupacao(pk, inicio, fim))
+        if dias is None:
+            return Response({'detail': 'Sala não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'sala': pk,
+            'geracao': geracao,
+            'dias': [
+                {'data': inicio + timedelta(days=i),
+                 'ocupado': [[_hora(de), _hora(ate)] for de, ate in intervalos(bits)]}
+                for i, bits in enumerate(dias)
+            ],
+        })
+
+
+class SalasLivresView(DisponibilidadeMixin, APIView):
+    """View para listar as salas livres num dia e horário.
+
+    Parâmetros: data (padrão: hoje), inicio e fim (HH:MM, obrigatórios). Os
+    horários são arredondados para as faixas de 30 minutos que os cobrem.
+    Métodos HTTP suportados: GET
+    Permissões: Professores ou gestores (IsProfessorOrGestor)
+    """
+
+    def get(self, request):
+        dia = _parametro(request, 'data', parse_date, 'uma data (AAAA-MM-DD)', timezone.localdate())
+        inicio = _parametro(request, 'inicio', parse_time, 'um horário (HH:MM)')
+        fim = _parametro(request, 'fim', parse_time, 'um horário (HH:MM)')
+        primeira, ultima = faixas(inicio, fim)
+        if ultima <= primeira:
+            raise ValidationError({'fim': 'O fim deve ser posterior ao início.'})
+        geracao, salas = self.ler_snapshot(lambda snapshot: snapshot.salas_livres(dia, primeira, ultima))
+        return Response({'data': dia, 'inicio': inicio, 'fim': fim, 'geracao': geracao, 'salas': salas})
+
+
 # Obter dados dos períodos em Json, para utilizar no FrontEnd
 def getPeriodoData(self):
     data = [{"value": value, "label": label} for value, label in PERIODO_CHOICES]
     return JsonResponse(data, safe=False)
     # safe=false, permite que seja enviado listas na resposta Json.
     # exemplo: [{"data": data, "valor":valor}] -> uma lista de objetos(dict)
-    
\ No newline at end of file
+    
+
+
+def _autenticar_stream(request):
+    """Autentica o stream via JWT no header Authorization ou em ?token=.
+
+    O EventSource do navegador não permite enviar headers, por isso o token
+    também é aceito na query string.
+    """
+    autenticacao = JWTAuthentication()
+    header = autenticacao.get_header(request)
+    raw_token = autenticacao.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        token = autenticacao.get_validated_token(raw_token)
+        return autenticacao.get_user(token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def reservas_stream(request):
+    """Stream SSE com criações, atualizações e exclusões de reservas.
+
+    Gestores recebem os eventos de todas as reservas do campus; professores
+    apenas das próprias. Conexões ociosas só enviam um comentário de keep-alive a cada
+    SSE_KEEPALIVE segundos. Deve ser servido pela aplicação ASGI (system/asgi.py).
+    Métodos HTTP suportados: GET
+    Permissões: Professores ou gestores autenticados via JWT
+    """
+    usuario = await sync_to_async(_autenticar_stream)(request)
+    if usuario is None or usuario.tipo not in ('GESTOR', 'PROFESSOR'):
+        return JsonResponse({'detail': 'Credenciais de autenticação inválidas.'}, status=401)
+
+    assinatura = hub_reservas.assinar(
+        usuario.pk,
+        usuario.tipo == 'GESTOR',
+        campus=getattr(request, 'campus', None),
+        limite=getattr(settings, 'SSE_QUEUE_SIZE', 100),
+    )
+    keepalive = getattr(settings, 'SSE_KEEPALIVE', 25)
+
+    async def eventos():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                pendentes = await assinatura.proximos(keepalive)
+                if not pendentes:
+                    yield ': keepalive\n\n'
+                    continue
+                if assinatura.perdidos:
+                    # O cliente deve recarregar a lista: eventos foram descartados.
+                    yield 'event: reserva_resync\ndata: {}\n\n'
+                    assinatura.perdidos = 0
+                for evento in pendentes:
+                    dados = json.dumps(evento['dados'], default=str)
+                    yield f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {dados}\n\n"
+        finally:
+            hub_reservas.cancelar(assinatura)
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,176 @@
+"""
+Aquecimento do processo antes de aceitar requests.
+
+Sem aquecimento, o primeiro request de cada worker novo (deploy, scale-out,
+reciclagem por max_requests) paga sozinho a importação das views, dos
+serializers e do simplejwt, a primeira conexão com o banco e os caches
+vazios. `aquecer()` faz esse trabalho em system/wsgi.py e system/asgi.py,
+antes de o servidor aceitar conexões, quando DJANGO_AQUECER está ligado
+(padrão em produção).
+
+Uma etapa que falha (ex.: banco fora do ar na subida) só gera um aviso: o
+worker sobe e o request paga o custo, como sem o aquecimento.
+`manage.py tempo_inicializacao` mede o efeito.
+
+"""
+
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+_fork_registrado = False
+
+# Tempos da última execução de aquecer(), mostrados por `manage.py tempo_inicializacao`.
+ultimo_aquecimento = {}
+
+
+def _views(padroes):
+    """Classes de view de todas as rotas, incluindo as de includes()."""
+    for padrao in padroes:
+        if isinstance(padrao, URLResolver):
+            yield from _views(padrao.url_patterns)
+        elif getattr(padrao.callback, 'view_class', None) is not None:
+            yield padrao.callback.view_class
+
+
+def _urls():
+    """Importa as URL confs (e com elas as views) e monta o índice do reverse()."""
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018 (a propriedade popula o resolver)
+    return f'{len(set(_views(resolver.url_patterns)))} views'
+
+
+def _serializers():
+    """Instancia cada view da API com um GET vazio e monta os campos do seu serializer.
+
+    Isso importa as classes configuradas no DRF (autenticação, renderers,
+    parsers, permissões) e preenche os caches de _meta dos models usados
+    pelos ModelSerializers. Nada é executado: o request não passa pela view.
+    """
+    from django.http import HttpRequest
+    from rest_framework.generics import GenericAPIView
+    from rest_framework.views import APIView
+
+    montados = set()
+    for classe in set(_views(get_resolver().url_patterns)):
+        if not issubclass(classe, APIView):
+            continue
+        requisicao = HttpRequest()
+        requisicao.method = 'GET'
+        view = classe(args=(), kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(requisicao)
+        view.get_renderers(), view.get_permissions(), view.get_throttles()
+        if issubclass(classe, GenericAPIView):
+            serializer_class = view.get_serializer_class()
+            if serializer_class not in montados:
+                serializer_class(context=view.get_serializer_context()).fields  # noqa: B018
+                montados.add(serializer_class)
+    return f'{len(montados)} serializers'
+
+
+def _autenticacao():
+    """Gera e valida um token (carrega o PyJWT) e preenche o cache de ContentType."""
+    from django.contrib.contenttypes.models import ContentType
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    AccessToken(str(AccessToken()))
+    ContentType.objects.get_for_models(*apps.get_models())
+    return 'token e content types'
+
+
+def _conexoes():
+    """Abre a conexão com cada banco e verifica as réplicas (registrando a saúde)."""
+    global _fork_registrado
+    from .replicas import replicas, saude_replicas
+
+    de_replica = {alias for aliases in replicas().values() for alias in aliases}
+    for alias in connections:
+        if alias in de_replica:
+            saude_replicas.saudavel(alias)
+        else:
+            connections[alias].ensure_connection()
+    if hasattr(os, 'register_at_fork') and not _fork_registrado:
+        os.register_at_fork(before=_fechar_antes_do_fork, after_in_child=_descartar_conexoes_herdadas)
+        _fork_registrado = True
+    return f'{len(connections.all())} bancos'
+
+
+def _fechar_antes_do_fork():
+    """Fecha conexões e pools do processo que vai fazer fork (ex.: master do `gunicorn --preload`).
+
+    Com o aquecimento no master, os workers herdariam os sockets abertos e,
+    com DB_POOL, o pool do psycopg (DatabaseWrapper._connection_pools) sem as
+    threads de manutenção dele: dois processos usariam a mesma sessão. Antes do
+    fork o processo ainda é o único dono e pode fechar tudo normalmente; cada
+    worker abre as próprias conexões no primeiro uso. Conexões no meio de uma
+    transação ficam abertas.
+    """
+    for conexao in connections.all(initialized_only=True):
+        if conexao.in_atomic_block:
+            continue
+        conexao.close()
+        # Só fecha pools já criados: acessar `conexao.pool` criaria um.
+        if conexao.alias in getattr(type(conexao), '_connection_pools', {}):
+            conexao.close_pool()
+
+
+def _descartar_conexoes_herdadas():
+    # O que sobrou aberto no fork (conexão em transação) pertence ao processo
+    # pai. O worker esquece a referência para abrir uma conexão própria; a
+    # coleta de lixo do objeto herdado ainda pode encerrar o socket, por isso o
+    # fechamento de verdade é feito antes do fork, em _fechar_antes_do_fork.
+    for conexao in connections.all(initialized_only=True):
+        conexao.connection = None
+
+
+def _caches():
+    """Mapeia o snapshot de disponibilidade e monta o índice de busca de cada campus."""
+    from .availability import snapshot_do_campus
+    from .routers import campi
+    from .search import indice_do_campus
+
+    codigos = campi() or [None]
+    for codigo in codigos:
+        snapshot_do_campus(codigo).janela()
+        indice_do_campus(codigo).carregar()
+    return f'{len(codigos)} campus(i)'
+
+
+ETAPAS = {
+    'urls': _urls,
+    'serializers': _serializers,
+    'autenticacao': _autenticacao,
+    'conexoes': _conexoes,
+    'caches': _caches,
+}
+
+
+def aquecer(etapas=None):
+    """Executa as etapas de aquecimento e devolve {etapa: segundos}."""
+    tempos = {}
+    for nome in etapas or ETAPAS:
+        inicio = time.perf_counter()
+        try:
+            detalhe = ETAPAS[nome]()
+        except Exception:
+            logger.warning('Aquecimento: etapa %s falhou', nome, exc_info=True)
+            detalhe = 'falhou'
+        tempos[nome] = time.perf_counter() - inicio
+        logger.info('Aquecimento: %s em %.3fs (%s)', nome, tempos[nome], detalhe)
+    ultimo_aquecimento.clear()
+    ultimo_aquecimento.update(tempos)
+    return tempos
+
+
+def aquecer_se_configurado(etapas=None):
+    """Chamada por system/wsgi.py e system/asgi.py; respeita DJANGO_AQUECER."""
+    if getattr(settings, 'AQUECER_PROCESSO', False):
+        return aquecer(etapas)
+    return {}
@@ -3,6 +3,9 @@ ASGI config for system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Além das rotas comuns, serve o stream SSE de reservas (app/reservas/stream/),
+que mantém as conexões abertas no loop de eventos sem ocupar uma thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -14,3 +17,16 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'system.settings')
 
 application = get_asgi_application()
+
+from app.checks import verificar_inicializacao  # noqa: E402
+
+verificar_inicializacao()
+
+from django.db import connections  # noqa: E402
+
+from app.warmup import aquecer_se_configurado  # noqa: E402
+
+# No ASGI as views síncronas rodam em outra thread, com outras conexões: a
+# etapa de conexões não adiantaria, e as abertas pelas outras etapas são fechadas.
+aquecer_se_configurado(etapas=['urls', 'serializers', 'autenticacao', 'caches'])
+connections.close_all()
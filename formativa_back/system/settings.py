@@ -9,23 +9,45 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
+
+def env_bool(nome, padrao=False):
+    """Lê uma variável de ambiente booleana (1/true/yes/on)."""
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(nome, padrao=''):
+    """Lê uma variável de ambiente separada por vírgulas."""
+    return [item.strip() for item in os.environ.get(nome, padrao).split(',') if item.strip()]
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# Perfil de execução: "development" (padrão) ou "production".
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development').strip().lower()
+PRODUCTION = DJANGO_ENV == 'production'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-3$n_yn1cv!g5%-ifmp25@8o2oz=w(i%fb#)c_aowjv9#0_pe2b'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-3$n_yn1cv!g5%-ifmp25@8o2oz=w(i%fb#)c_aowjv9#0_pe2b',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Com DEBUG ligado o Django guarda todas as queries executadas em memória.
+DEBUG = env_bool('DJANGO_DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS')
 
 
 # Application definition
@@ -63,23 +85,94 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    # Primeiro, para que as respostas geradas pelos middlewares abaixo (ex.: 400
+    # do X-Campus, 429 do rate limit) também levem os headers de CORS.
+    "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    'app.routers.CampusMiddleware',
+    'app.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "corsheaders.middleware.CorsMiddleware",
+    'app.throttling.RateLimitMiddleware',
     ]
 
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
     'http://localhost:5174',
 ]
+CORS_EXPOSE_HEADERS = ['Retry-After']
+CORS_ALLOW_HEADERS = (*default_headers, 'x-campus')
+
+# Limite de requisições (app/throttling.py): (capacidade da rajada, tokens por segundo).
+# Taxa 0: o balde não é reposto (429 sem Retry-After depois de esgotado).
+# ARMAZEM: "memoria" (por processo) ou caminho de um arquivo SQLite compartilhado
+# entre os workers da máquina.
+# PROXIES: quantos proxies reversos confiáveis ficam na frente do servidor. Com 0
+# o IP do cliente é o REMOTE_ADDR; com N, é o N-ésimo endereço da direita no
+# X-Forwarded-For (os anteriores vêm do cliente e podem ser forjados).
+RATE_LIMIT = {
+    'ATIVO': env_bool('RATE_LIMIT_ATIVO', True),
+    'ARMAZEM': os.environ.get('RATE_LIMIT_ARMAZEM', 'memoria'),
+    'PROXIES': int(os.environ.get('RATE_LIMIT_PROXIES', 0)),
+    'PAPEIS': {
+        'GESTOR': (120, 20),
+        'PROFESSOR': (60, 10),
+        'ANONIMO': (30, 5),
+    },
+    'ROTAS': {
+        'reserva-list-create': (30, 5),
+        'reserva-calendario': (20, 2),
+        'busca': (60, 20),
+    },
+    'AUTH': (5, 0.2),  # por IP: rajada de 5 tentativas e depois 1 a cada 5 segundos
+}
 
 ROOT_URLCONF = 'system.urls'
 
+# Stream SSE de reservas (app/events.py)
+SSE_KEEPALIVE = 25  # segundos entre comentários de keep-alive
+SSE_QUEUE_SIZE = 100  # eventos pendentes por conexão antes de descartar
+
+# Índice de busca typeahead (app/search.py): segundos até remontar a partir do banco
+SEARCH_INDEX_TTL = 300
+
+# Snapshot de disponibilidade das salas (app/availability.py): arquivo mapeado em
+# memória e compartilhado por todos os workers da máquina, um por campus.
+DISPONIBILIDADE = {
+    'ARQUIVO': os.environ.get('DISPONIBILIDADE_ARQUIVO', BASE_DIR / 'disponibilidade.bin'),
+    'DIAS_PASSADOS': 7,  # dias antes de hoje mantidos no snapshot
+    'DIAS': 400,  # tamanho da janela, em dias
+}
+
+# Maior janela (em dias) aceita pelo calendário e pela expansão de reservas recorrentes
+JANELA_MAXIMA_DIAS = 366
+
+# Linhas removidas por transação na exclusão em lote de usuários e salas (app/deletion.py)
+EXCLUSAO_LOTE = 500
+# Minutos sem progresso para uma exclusão EXECUTANDO ser tida como interrompida
+# (o executor caiu) e poder ser assumida de novo.
+EXCLUSAO_PARADA_HA = 10
+
+# Fila de tarefas no banco (app/jobs.py, executada por `manage.py worker`).
+# NO_PROCESSO: também executa cada tarefa numa thread do servidor logo após o
+# commit, para o desenvolvimento funcionar sem o worker rodando.
+TAREFAS = {
+    'PROCESSOS': int(os.environ.get('TAREFAS_PROCESSOS', 2)),  # tarefas em paralelo por worker
+    'INTERVALO': 1.0,  # segundos entre consultas à fila ociosa
+    'ESPERA_BASE': 5,  # segundos até a 2ª tentativa; dobra a cada falha
+    'ESPERA_MAXIMA': 600,
+    'NO_PROCESSO': env_bool('TAREFAS_NO_PROCESSO', not PRODUCTION),
+}
+
+# Aquecimento do processo (app/warmup.py) em system/wsgi.py e system/asgi.py,
+# antes de aceitar requests: importa views e serializers, abre as conexões e
+# carrega os caches para o primeiro request de um worker novo não pagar por isso.
+AQUECER_PROCESSO = env_bool('DJANGO_AQUECER', PRODUCTION)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -102,24 +195,99 @@ WSGI_APPLICATION = 'system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.sqlite3',
-#         'NAME': BASE_DIR / 'db.sqlite3',
-#     }
-# }
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'cadastro',
-        'USER': 'root',
-        'PASSWORD': 'root',
-        'HOST': 'localhost',
-        'PORT': '3306'
+# DB_ENGINE: "mysql" (padrão), "postgresql" ou "sqlite" (stand-in local).
+# DB_CONN_MAX_AGE: segundos que uma conexão persistente é reaproveitada entre
+# requests (0 abre uma conexão nova por request). Em produção o padrão é 600.
+# DB_POOL: liga o pool de conexões nativo do Django (apenas PostgreSQL); nos
+# demais bancos as conexões persistentes por thread fazem esse papel, e pedir o
+# pool é um erro de configuração (app.E002).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'mysql').strip().lower()
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': f'django.db.backends.{DB_ENGINE}',
+            'NAME': os.environ.get('DB_NAME', 'cadastro'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', 'root'),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432' if DB_ENGINE == 'postgresql' else '3306'),
+        }
+    }
+
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600 if PRODUCTION else 0))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = env_bool('DB_CONN_HEALTH_CHECKS', True)
+
+DB_POOL = env_bool('DB_POOL')
+if DB_POOL and DB_ENGINE == 'postgresql':
+    # O pool substitui as conexões persistentes (o Django exige CONN_MAX_AGE = 0).
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        },
     }
+
+# Multi-campus (app/routers.py): DB_CAMPI="centro,norte" cria um banco por campus
+# (alias campus_<código>) para salas, disciplinas e reservas. Usuários e
+# autenticação continuam no banco default. Vazio = tudo no default.
+CAMPI = {}
+for codigo in env_list('DB_CAMPI'):
+    alias = f'campus_{codigo}'
+    DATABASES[alias] = dict(DATABASES['default'])
+    if DB_ENGINE == 'sqlite':
+        nome = Path(DATABASES['default']['NAME'])
+        DATABASES[alias]['NAME'] = nome.with_name(f'{nome.stem}_{codigo}{nome.suffix}')
+    else:
+        DATABASES[alias]['NAME'] = f"{DATABASES['default']['NAME']}_{codigo}"
+    CAMPI[codigo] = alias
+CAMPUS_PADRAO = os.environ.get('DB_CAMPUS_PADRAO') or next(iter(CAMPI), None)
+
+# Réplicas de leitura (app/replicas.py): DB_REPLICAS="host1,host2" cria réplicas
+# de cada banco primário (alias <primário>_replica<n>), que recebem as leituras.
+# No stand-in SQLite cada item é um arquivo, aberto em modo somente leitura
+# (com DB_CAMPI, o arquivo de cada campus ganha o sufixo _<código>).
+DATABASE_REPLICAS = {}
+_sufixos = {'default': '', **{alias: f'_{codigo}' for codigo, alias in CAMPI.items()}}
+for primario, sufixo in _sufixos.items():
+    for numero, destino in enumerate(env_list('DB_REPLICAS'), 1):
+        alias = f'{primario}_replica{numero}'
+        DATABASES[alias] = dict(DATABASES[primario], TEST={'MIRROR': primario})
+        if DB_ENGINE == 'sqlite':
+            arquivo = Path(destino)
+            arquivo = arquivo.with_name(f'{arquivo.stem}{sufixo}{arquivo.suffix}')
+            DATABASES[alias]['NAME'] = f'file:{arquivo}?mode=ro'
+        else:
+            DATABASES[alias]['HOST'] = destino
+        DATABASE_REPLICAS.setdefault(primario, []).append(alias)
+
+REPLICAS = {
+    # Segundos lendo do primário após escrever; não pode ser menor que ATRASO_MAXIMO (app.E006).
+    'FIXAR_APOS_ESCRITA': int(os.environ.get('DB_REPLICA_FIXACAO', 10)),
+    'INTERVALO_SAUDE': 5,  # segundos entre verificações de cada réplica
+    'ATRASO_MAXIMO': 10,  # segundos de atraso de replicação tolerados
 }
 
+DATABASE_ROUTERS = ['app.replicas.ReplicaRouter', 'app.routers.CampusRouter']
+
+# Cache do Django. Por padrão fica na memória do processo; com vários workers use
+# DJANGO_CACHE_DIR para que a fixação das réplicas valha entre processos.
+if os.environ.get('DJANGO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'system.settings')
 
 application = get_wsgi_application()
+
+from app.checks import verificar_inicializacao  # noqa: E402
+
+verificar_inicializacao()
+
+from app.warmup import aquecer_se_configurado  # noqa: E402
+
+aquecer_se_configurado()